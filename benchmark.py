@@ -0,0 +1,198 @@
+"""Time the conversion pipeline of run.py on synthetic ALA downloads.
+
+Writes the timings of each stage (CSV read, model build, triple emission,
+triple insertion and serialization) per input size as JSON, so results can be
+compared across versions. The records are read, converted and written with
+the same functions as run.py, so the timings are those of the converter:
+
+    python benchmark.py --sizes 1000 10000 --output benchmark-results.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+from datetime import datetime, timezone
+from time import perf_counter
+
+import rdflib
+
+from src.buffer import TripleBuffer
+from src.convert import build_models, to_triples
+from src.graph import create_graph
+from src.interning import InternCache
+from src.readers import mapped_columns
+from src.streaming import iter_rows, open_writer, write_graph
+from src.synthetic import generate
+
+STAGES = ["read", "build", "emit", "insert", "serialize"]
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(
+    filename,
+    output_filename,
+    stream,
+    chunksize,
+    intern_cache_size,
+    graph_store=None,
+    triple_buffer=False,
+):
+    seconds = dict.fromkeys(STAGES, 0.0)
+    n_rows = n_triples = 0
+    cache = InternCache(intern_cache_size) if intern_cache_size else None
+
+    if stream:
+        writer = open_writer(output_filename, "nt")
+    elif triple_buffer and not graph_store:
+        g = TripleBuffer()
+    else:
+        g = create_graph(graph_store)
+
+    rows = iter_rows(filename, chunksize, columns=mapped_columns())
+    start = perf_counter()
+    while True:
+        t0 = perf_counter()
+        try:
+            _, row = next(rows)
+        except StopIteration:
+            break
+        t1 = perf_counter()
+        record_models = build_models(row, cache)
+        t2 = perf_counter()
+        triples = to_triples(record_models)
+        t3 = perf_counter()
+        if stream:
+            writer.write(triples)
+        else:
+            g.addN((s, p, o, g) for s, p, o in triples)
+        t4 = perf_counter()
+
+        seconds["read"] += t1 - t0
+        seconds["build"] += t2 - t1
+        seconds["emit"] += t3 - t2
+        # When streaming, writing a record is part of serialization.
+        seconds["serialize" if stream else "insert"] += t4 - t3
+        n_rows += 1
+        n_triples += len(triples)
+
+    t0 = perf_counter()
+    if stream:
+        writer.close()
+    else:
+        write_graph(g, output_filename, "turtle")
+        if graph_store:
+            g.close()
+    seconds["serialize"] += perf_counter() - t0
+    seconds["total"] = perf_counter() - start
+
+    return {
+        "rows": n_rows,
+        "triples": n_triples,
+        "seconds": seconds,
+        "rows_per_second": n_rows / seconds["total"],
+        "triples_per_second": n_triples / seconds["total"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[1_000, 10_000, 100_000, 1_000_000],
+        help="numbers of synthetic records to convert",
+    )
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument(
+        "--data-dir",
+        help="directory for the synthetic CSV files, reused if they exist "
+        "(default: a temporary directory)",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="stream N-Triples instead of serializing an in-memory graph",
+    )
+    parser.add_argument(
+        "--graph-store",
+        help="keep the graph in this SQLite database instead of in memory",
+    )
+    parser.add_argument(
+        "--triple-buffer",
+        action="store_true",
+        help="keep the graph in memory as integer ids of its terms",
+    )
+    parser.add_argument("--chunk-size", type=int, default=10_000)
+    parser.add_argument("--intern-cache-size", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = args.data_dir or tmp
+        os.makedirs(data_dir, exist_ok=True)
+
+        results = []
+        for size in args.sizes:
+            filename = os.path.join(data_dir, f"synthetic-{size}-{args.seed}.csv")
+            if not os.path.exists(filename):
+                generate(filename, size, args.seed)
+            output_filename = os.path.join(
+                tmp, "output.nt" if args.stream else "output.ttl"
+            )
+
+            result = run(
+                filename,
+                output_filename,
+                args.stream,
+                args.chunk_size,
+                args.intern_cache_size,
+                args.graph_store,
+                args.triple_buffer,
+            )
+            results.append(result)
+            print(
+                f"{size} rows: {result['seconds']['total']:.2f}s, "
+                f"{result['rows_per_second']:.0f} rows/s, "
+                + ", ".join(
+                    f"{stage} {result['seconds'][stage]:.2f}s" for stage in STAGES
+                )
+            )
+
+    report = {
+        "commit": git_commit(),
+        "created": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "rdflib": rdflib.__version__,
+        "platform": platform.platform(),
+        "options": {
+            "stream": args.stream,
+            "graph_store": args.graph_store is not None,
+            "triple_buffer": args.triple_buffer,
+            "chunk_size": args.chunk_size,
+            "intern_cache_size": args.intern_cache_size,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,354 +1,400 @@
-from enum import Enum
-from uuid import uuid4
-from datetime import datetime
+import os
+import sys
 
-import pandas as pd
-from rdflib import BNode, SOSA
+from rdflib import URIRef
 
-from src import value, create_uriref, insert_data
+from src import instrumentation
+from src.buffer import TripleBuffer
+from src.checkpoint import Checkpoint, Quarantine, State
+from src.convert import build_models, to_triples
+from src.delta import delta_convert
 from src.graph import create_graph
-from src.jsonld_context import jsonld_context
-from src.models import (
-    Geometry,
-    MaterialSample,
-    Procedure,
-    RDFDataset,
-    Sampling,
-    Person,
-    Sample,
-    Attribute,
-    SiteVisit,
-    Text,
-    Observation,
-    TimeInstant,
-    Taxon,
-    Site,
-)
-from src.namespaces import EX, BDR_CV
+from src.interning import InternCache
+from src.mapping import load_mapping
+from src.parallel import parallel_convert
+from src.pipeline import Pipeline
+from src.readers import mapped_columns
+from src.serializer import parse_ntriples
+from src.sites import SiteIndex
+from src.stats import DatasetStatistics
+from src.streaming import FORMATS, iter_rows, open_writer, write_graph
+from src.upload import GraphStoreWriter
+from src.validation import RecordValidator
 
 TRANSFORM_SINGLE_RECORD = False
 
-g = create_graph()
-
+# Set to "nt", "nquads" or "turtle" to write each record to the output file as
+# soon as it is converted instead of building the whole graph in memory.
+# "record-graphs" writes each record into its own named graph, in gzip N-Quads
+# shards in the directory output.graphs, with a manifest.json.
+STREAM_FORMAT = None
+
+# Records per shard of the "record-graphs" output.
+RECORDS_PER_SHARD = 10_000
+
+# Named graph used for N-Quads output.
+GRAPH_NAME = URIRef("https://doi.org/10.26197/ala.26fdc11f-107e-45fa-9aab-3aead9083137")
+
+CHUNK_SIZE = 10_000
+
+# With more than one worker, row ranges of the CSV file are converted in a
+# process pool, each into its own output shard.
+WORKERS = 1
+
+# Set to False to keep the shards of a parallel run instead of merging them.
+MERGE_SHARDS = True
+
+# Set to a positive size to intern persons, taxa and vocabulary terms in a
+# cache of that many entries. Interned persons are shared across records by name.
+INTERN_CACHE_SIZE = 0
+
+# Set to a distance in metres to merge co-located records with the same
+# location remarks into one site, within their coordinate uncertainty up to
+# this distance. Parallel workers merge sites within their own row ranges.
+SITE_RADIUS = None
+
+# Set to "gz" or "zst" to compress the output file with gzip or zstd (which
+# requires zstandard).
+COMPRESSION = None
+
+# Set to a SQLite database filename to keep the graph on disk instead of in
+# memory. The graph is then written to the output file in subject order. A
+# database already at that filename is replaced.
+GRAPH_STORE = None
+
+# Set to True to keep the graph in memory as integer ids of its terms (see
+# src/buffer.py) rather than in an rdflib graph, which takes several times
+# less memory for the same output. Not used with a GRAPH_STORE.
+TRIPLE_BUFFER = False
+
+# Set to True to build the records with the validated pydantic models of
+# src/models.py instead of the fast entities of src/entities.py. Both raise
+# on rows with missing required values, e.g. a date that could not be
+# parsed, which a QUARANTINE_FILENAME sets aside.
+STRICT_MODELS = False
+
+# Set to a mapping table, e.g. "mapping.csv", to convert rows with the
+# compiled mapping instead of the models in src/models.py.
+MAPPING_FILENAME = None
+
+# Set to a filename to write a JSON report of stage timings, throughput, graph
+# size and peak memory of the run.
+REPORT_FILENAME = None
+
+# Print a progress line every this many rows (0 to disable).
+PROGRESS_EVERY = 0
+
+# Set to a SPARQL 1.1 Graph Store Protocol endpoint, e.g.
+# "http://localhost:3030/ds/data", to post the records to GRAPH_NAME in
+# batches of UPLOAD_BATCH_SIZE triples while converting, instead of writing
+# an output file. Up to UPLOAD_CONCURRENCY batches are posted at a time.
+# Uploads run in this process, whatever the number of WORKERS.
+#
+# Set UPLOAD_RECORD_GRAPHS to True to put each record into its own named
+# graph instead (see src/upload.py), which replaces the graph if it is sent
+# again. Batches posted again add their blank nodes twice, so uploads are
+# only resumed from a checkpoint with record graphs. Blank nodes are not
+# shared between requests, so records are not uploaded with an
+# INTERN_CACHE_SIZE.
+UPLOAD_ENDPOINT = None
+UPLOAD_BATCH_SIZE = 50_000
+UPLOAD_CONCURRENCY = 4
+UPLOAD_RECORD_GRAPHS = False
+
+# Set to True to read, convert and write the records in three threads, with
+# bounded queues between them, so reading and writing overlap the conversion
+# of the records. The utilization of each stage is printed at the end.
+PIPELINE = False
+
+# Set to a SHACL shapes file to validate each record as it is converted, in
+# VALIDATION_WORKERS processes (all cores if None), and write the results
+# counted by kind to VALIDATION_REPORT_FILENAME. Requires pyshacl. Records
+# converted by parallel WORKERS are not validated, so WORKERS must be 1, and
+# records are only validated whole without INTERN_CACHE_SIZE or SITE_RADIUS.
+SHAPES_FILENAME = None
+VALIDATION_WORKERS = None
+VALIDATION_REPORT_FILENAME = "validation-report.json"
+
+# Set to True to count the records as they are converted and write a VoID
+# description of the output, with its class and property partitions, to
+# output.void.ttl, and the counts of records by taxon, collector and site,
+# with their spatial and temporal extents, to output.stats.json. Records
+# converted by parallel WORKERS are not counted, so WORKERS must be 1, and
+# the counts start over when a run resumes from a checkpoint.
+WRITE_STATISTICS = False
+
+# Set to a filename to write the rows that fail to convert, with their error,
+# as JSON lines and carry on instead of stopping the run.
+QUARANTINE_FILENAME = None
+
+# Set to a filename to save the progress of a streamed conversion (see
+# STREAM_FORMAT) every CHECKPOINT_EVERY rows. If the file exists, e.g. after
+# a crash, the conversion resumes from it. It is removed when the run ends.
+CHECKPOINT_FILENAME = None
+CHECKPOINT_EVERY = 10_000
+
+# Set to the previous snapshot of the input file to write only the changes
+# since it, as an RDF Patch (output.rdfp), converting only the added and
+# changed rows. A hash of each row is kept in an index next to each snapshot,
+# with the number of records that produce each triple of a taxon or procedure.
+PREVIOUS_CSV_FILENAME = None
+
+# Input file: a CSV file (optionally compressed), or a Parquet (.parquet) or
+# Arrow IPC (.arrow, .feather) file, which require pyarrow. Only the columns
+# used by the mapping are read.
 CSV_FILENAME = "records-2021-12-01.csv"
 
-df = pd.read_csv(CSV_FILENAME)
-
-
-class StateOrTerritory(Enum):
-    WA = "http://linked.data.gov.au/dataset/asgs2016/stateorterritory/5"
 
+def main():
+    if REPORT_FILENAME or PROGRESS_EVERY:
+        instrumentation.enable(PROGRESS_EVERY)
 
-for i, row in df.iterrows():
-
-    # If debug is on, only process the data in the third row.
-    if TRANSFORM_SINGLE_RECORD and i != 1:
-        continue
-
-    ### RDFDataset (Record)
-
-    attr_country_code = Attribute(
-        id=BNode().n3(),
-        attribute=BDR_CV["country-code"],
-        has_simple_value=value(row["countryCode"]),
-        has_value=Text(id=BNode().n3(), value=value(row["countryCode"])),
-    )
-
-    attr_provenance = Attribute(
-        id=BNode().n3(),
-        attribute=BDR_CV["provenance"],
-        has_simple_value=value(row["provenance"]),
-        has_value=Text(id=BNode().n3(), value=value(row["provenance"])),
-    )
-
-    record = RDFDataset(
-        id=EX[str(uuid4())],
-        identifier=value(row["recordID"]),
-        license="https://creativecommons.org/licenses/by/4.0/",
-        subject=BDR_CV[create_uriref(row["collectionCode"])],
-        source="https://doi.org/10.26197/ala.26fdc11f-107e-45fa-9aab-3aead9083137",
-        rights_holder="https://museum.wa.gov.au/",
-        has_attribute=[attr_country_code, attr_provenance],
-        comment="Equivalent to dwc:Record.",
-    )
+    graph_size = convert()
 
-    ### End RDFDataset (Record)
+    if REPORT_FILENAME:
+        instrumentation.active.write_report(REPORT_FILENAME, graph_size)
 
-    recorded_by = Person(
-        id=BNode().n3(), name=value(row["recordedBy"]), in_dataset=record
-    )
 
-    event_date = value(row["eventDate"])
-    if event_date:
-        occurrence_sampling_datetime = event_date
+def convert():
+    """Run the conversion, returning the size of the graph if one was built."""
+    if TRANSFORM_SINGLE_RECORD:
+        output_filename = "output-row-2"
     else:
-        verbatim_event_date = value(row["verbatimEventDate"]).split("/")
-        occurrence_sampling_datetime = datetime.fromisoformat(
-            f"{verbatim_event_date[2]}-{verbatim_event_date[1]}-{verbatim_event_date[0]}"
-        ).isoformat()
-
-    ### Site
-
-    site_establishment_uri = EX[str(uuid4())]
-    site_uri = "https://linked.data.gov.au/dataset/bdr/site/" + str(uuid4())
-
-    site_point = Geometry(
-        id=BNode().n3(),
-        as_wkt=f"POINT({value(row['decimalLongitude'])} {value(row['decimalLatitude'])})",
-        elevation=str(value(row["verbatimElevation"])).replace(" ", "").replace("m", "")
-        if value(row["verbatimElevation"])
-        else None,
-        has_metric_spatial_accuracy=value(row["coordinateUncertaintyInMeters"]),
-    )
-
-    site = Site(
-        id=site_uri,
-        feature_type="http://linked.data.gov.au/def/tern-cv/5bf7ae21-a454-440b-bdd7-f2fe982d8de4",
-        identifier=site_uri,
-        is_sample_of=StateOrTerritory.WA.value,
-        is_result_of=site_establishment_uri,
-        location_description=value(row["locationRemarks"]),
-        in_dataset=record,
-        has_geometry=site_point,
-    )
-
-    site_establishment = Sampling(
-        id=site_establishment_uri,
-        comment="Site establishment",
-        has_feature_of_interest=site,
-        was_associated_with=recorded_by,
-        used_procedure=EX["site-establishment-method"],
-        result_time=occurrence_sampling_datetime,
-        has_result=site,
-        in_dataset=record,
-    )
-
-    site_visit = SiteVisit(
-        id=EX[str(uuid4())],
-        started_at_time=occurrence_sampling_datetime,
-        has_site=site,
-        in_dataset=record,
-    )
-
-    insert_data({**jsonld_context, **site.dict(by_alias=True)}, g)
-    insert_data({**jsonld_context, **site_establishment.dict(by_alias=True)}, g)
-    insert_data({**jsonld_context, **site_visit.dict(by_alias=True)}, g)
-
-    ### End Site
-
-    ### Occurrence sampling
-
-    occurrence_sampling_id = EX[str(uuid4())]
-
-    occurrence = Sample(
-        id=EX[str(uuid4())],
-        identifier=value(row["occurrenceID"]),
-        comment="occurrence",
-        is_sample_of=site,
-        is_result_of=occurrence_sampling_id,
-        feature_type="http://linked.data.gov.au/def/tern-cv/2361dea8-598c-4b6f-a641-2b98ff199e9e",
-        in_dataset=record,
+        output_filename = "output"
+    # Record graph shards are always gzip compressed.
+    compression = (
+        f".{COMPRESSION}" if COMPRESSION and STREAM_FORMAT != "record-graphs" else ""
     )
 
-    occurrence_sampling = Sampling(
-        id=occurrence_sampling_id,
-        identifier=value(row["fieldNumber"]),
-        has_feature_of_interest=site,
-        sampling_type=BDR_CV[create_uriref(value(row["samplingProtocol"]))]
-        if value(row["samplingProtocol"])
-        else None,
-        sf_within=[
-            "https://sws.geonames.org/2077456/",
-            StateOrTerritory.WA.value,
-        ],
-        result_time=occurrence_sampling_datetime,
-        comment=value(row["locationRemarks"]),
-        was_associated_with=recorded_by,
-        has_result=occurrence,
-        used_procedure=EX["occurrence-method"],
-        in_dataset=record,
-    )
-
-    ### End of occurrence sampling
-
-    ### Specimen sampling
-
-    specimen_sampling_id = EX[str(uuid4())]
+    if PREVIOUS_CSV_FILENAME:
+        with instrumentation.stage("delta"):
+            delta_convert(
+                PREVIOUS_CSV_FILENAME,
+                CSV_FILENAME,
+                f"{output_filename}.rdfp{compression}",
+                MAPPING_FILENAME,
+                CHUNK_SIZE,
+            )
+        return None
+
+    if WORKERS > 1 and not TRANSFORM_SINGLE_RECORD and not UPLOAD_ENDPOINT:
+        if SHAPES_FILENAME:
+            raise ValueError("SHAPES_FILENAME can only be validated with 1 worker.")
+        if WRITE_STATISTICS:
+            raise ValueError("WRITE_STATISTICS can only be counted with 1 worker.")
+        if STREAM_FORMAT:
+            with instrumentation.stage("parallel"):
+                parallel_convert(
+                    CSV_FILENAME,
+                    f"{output_filename}.{FORMATS[STREAM_FORMAT]}{compression}",
+                    STREAM_FORMAT,
+                    WORKERS,
+                    GRAPH_NAME,
+                    MERGE_SHARDS,
+                    CHUNK_SIZE,
+                    INTERN_CACHE_SIZE,
+                    MAPPING_FILENAME,
+                    RECORDS_PER_SHARD,
+                    SITE_RADIUS,
+                    STRICT_MODELS,
+                )
+            return None
+
+        g = new_graph()
+        with instrumentation.stage("parallel"):
+            shards = parallel_convert(
+                CSV_FILENAME,
+                f"{output_filename}.nt",
+                "nt",
+                WORKERS,
+                merge=False,
+                chunksize=CHUNK_SIZE,
+                intern_cache_size=INTERN_CACHE_SIZE,
+                mapping_filename=MAPPING_FILENAME,
+                site_radius=SITE_RADIUS,
+                strict=STRICT_MODELS,
+            )
+        with instrumentation.stage("insert"):
+            for shard in shards:
+                parse_ntriples(g, shard)
+                os.remove(shard)
+        with instrumentation.stage("serialize"):
+            return serialize(g, f"{output_filename}.ttl{compression}")
+
+    # Records are written as they are converted, rather than kept in a graph.
+    stream = bool(STREAM_FORMAT or UPLOAD_ENDPOINT)
+
+    # Interned persons are blank nodes, which would be a new node in each
+    # request that refers to them.
+    if UPLOAD_ENDPOINT and INTERN_CACHE_SIZE:
+        raise ValueError("UPLOAD_ENDPOINT can not upload interned records.")
+
+    # Interned entities and merged sites are only written with the first
+    # record of them, so the records after it would be validated without.
+    if SHAPES_FILENAME and (INTERN_CACHE_SIZE or SITE_RADIUS):
+        raise ValueError("SHAPES_FILENAME can not validate interned or merged records.")
+
+    checkpoint = state = None
+    if CHECKPOINT_FILENAME:
+        if not stream:
+            raise ValueError("Checkpoints require a STREAM_FORMAT.")
+        if UPLOAD_ENDPOINT and not UPLOAD_RECORD_GRAPHS:
+            raise ValueError("Uploads are only resumed with UPLOAD_RECORD_GRAPHS.")
+        checkpoint = Checkpoint(CHECKPOINT_FILENAME)
+        state = checkpoint.load()
+
+    if UPLOAD_ENDPOINT:
+        writer = GraphStoreWriter(
+            UPLOAD_ENDPOINT,
+            GRAPH_NAME,
+            UPLOAD_BATCH_SIZE,
+            UPLOAD_CONCURRENCY,
+            record_graphs=UPLOAD_RECORD_GRAPHS,
+        )
+    elif STREAM_FORMAT:
+        writer = open_writer(
+            f"{output_filename}.{FORMATS[STREAM_FORMAT]}{compression}",
+            STREAM_FORMAT,
+            GRAPH_NAME,
+            RECORDS_PER_SHARD,
+            state.output_size if state else None,
+        )
+    else:
+        g = new_graph()
 
-    specimen = MaterialSample(
-        id=EX[str(uuid4())],
-        comment="specimen",
-        is_sample_of=occurrence.id,
-        is_result_of=specimen_sampling_id,
-        feature_type="http://linked.data.gov.au/def/tern-cv/cd5cbdbb-07d9-4a5b-9b11-5ab9d6015be6",
-        in_dataset=record,
-    )
+    validator = None
+    if SHAPES_FILENAME:
+        validator = RecordValidator(SHAPES_FILENAME, VALIDATION_WORKERS)
 
-    specimen_sampling = Sampling(
-        id=specimen_sampling_id,
-        used_procedure=Procedure(
-            id=EX["specimen-sampling"], description=value(row["preparations"])
-        ),
-        result_time=occurrence_sampling_datetime,
-        was_associated_with=recorded_by,
-        has_result=specimen,
-        has_feature_of_interest=occurrence,
-        in_dataset=record,
-    )
+    statistics = DatasetStatistics() if WRITE_STATISTICS else None
 
-    ### End of specimen sampling
-
-    ### Occurrence observations
-
-    if value(row["sex"]):
-        sex_observation = Observation(
-            id=EX[str(uuid4())],
-            comment="Sex of the occurrence.",
-            in_dataset=record,
-            was_associated_with=recorded_by,
-            has_feature_of_interest=occurrence,
-            has_simple_result=value(row["sex"]),
-            has_result=Text(id=BNode().n3(), value=value(row["sex"])),
-            observed_property="http://linked.data.gov.au/def/tern-cv/05cbf534-c233-4aa8-a08c-00b28976ed36",
-            phenomenon_time=TimeInstant(
-                id=BNode().n3(), date_timestamp=occurrence_sampling_datetime
-            ),
-            result_time=occurrence_sampling_datetime,
-            used_procedure=BDR_CV["occurrence-method"],
+    quarantine = None
+    if QUARANTINE_FILENAME:
+        quarantine = Quarantine(
+            QUARANTINE_FILENAME, state.quarantine_size if state else None
         )
 
-        insert_data({**jsonld_context, **sex_observation.dict(by_alias=True)}, g)
-
-    life_stage_observation = Observation(
-        id=EX[str(uuid4())],
-        comment="life stage of the occurrence.",
-        in_dataset=record,
-        was_associated_with=recorded_by,
-        has_feature_of_interest=occurrence,
-        has_simple_result=value(row["lifeStage"]),
-        has_result=Text(id=BNode().n3(), value=value(row["lifeStage"])),
-        observed_property="http://linked.data.gov.au/def/tern-cv/abb0ee19-b2e8-42f3-8a25-d1f39ca3ebc3",
-        phenomenon_time=TimeInstant(
-            id=BNode().n3(), date_timestamp=occurrence_sampling_datetime
-        ),
-        result_time=occurrence_sampling_datetime,
-        used_procedure=BDR_CV["occurrence-method"],
+    cache = InternCache(INTERN_CACHE_SIZE) if INTERN_CACHE_SIZE else None
+    mapping = load_mapping(MAPPING_FILENAME) if MAPPING_FILENAME else None
+    # Sites are resolved as the rows are converted, rather than as they are
+    # read, so a site is only started by a record that is written.
+    sites = SiteIndex(SITE_RADIUS) if SITE_RADIUS else None
+
+    rows = iter_rows(
+        CSV_FILENAME,
+        CHUNK_SIZE,
+        start=state.rows if state else 0,
+        columns=mapped_columns(mapping),
     )
-
-    insert_data({**jsonld_context, **life_stage_observation.dict(by_alias=True)}, g)
-
-    habitat_observation = Observation(
-        id=EX[str(uuid4())],
-        comment="habitat of the occurrence.",
-        in_dataset=record,
-        was_associated_with=recorded_by,
-        has_feature_of_interest=occurrence,
-        has_simple_result=str(value(row["habitat"])),
-        has_result=Text(id=BNode().n3(), value=value(row["habitat"])),
-        observed_property="http://linked.data.gov.au/def/tern-cv/2090cfd9-8b6b-497b-9512-497456a18b99",
-        phenomenon_time=TimeInstant(
-            id=BNode().n3(), date_timestamp=occurrence_sampling_datetime
-        ),
-        result_time=occurrence_sampling_datetime,
-        used_procedure=BDR_CV["occurrence-method"],
+    # If debug is on, only process the data in the third row.
+    rows = (
+        (i, row)
+        for i, row in instrumentation.timed("read", rows)
+        if not TRANSFORM_SINGLE_RECORD or i == 1
     )
 
-    insert_data({**jsonld_context, **habitat_observation.dict(by_alias=True)}, g)
-
-    ### End of occurrence observations
+    def convert_record(i, row):
+        """Convert a row, returning its triples or the error it raised if quarantined."""
+        try:
+            if sites is not None:
+                with instrumentation.stage("sites"):
+                    row["_site"] = sites.resolve_row(row)
+            if mapping is not None:
+                with instrumentation.stage("convert"):
+                    return mapping.convert(row, cache), None
+            with instrumentation.stage("build"):
+                record_models = build_models(row, cache, STRICT_MODELS)
+            with instrumentation.stage("emit"):
+                return to_triples(record_models), None
+        except Exception as e:
+            if quarantine is None:
+                raise
+            # Entities interned by the failed row were never written.
+            if cache is not None:
+                cache.clear()
+            if sites is not None:
+                sites.discard(row["recordID"])
+            return None, e
+
+    def output_record(i, row, triples, error):
+        if error is not None:
+            quarantine.add(i, row, error)
+            return
+
+        if stream:
+            with instrumentation.stage("write"):
+                writer.write(triples)
+        else:
+            with instrumentation.stage("insert"):
+                g.addN((s, p, o, g) for s, p, o in triples)
+
+        if validator is not None:
+            with instrumentation.stage("validate"):
+                validator.write(triples)
+
+        if statistics is not None:
+            with instrumentation.stage("statistics"):
+                statistics.add(row, triples)
+
+        instrumentation.record(len(triples))
+
+        if checkpoint is not None and (i + 1) % CHECKPOINT_EVERY == 0:
+            quarantine_size = quarantine.checkpoint() if quarantine else 0
+            checkpoint.save(State(i + 1, writer.checkpoint(), quarantine_size))
+
+    def convert_batch(batch):
+        return [(i, row, *convert_record(i, row)) for i, row in batch]
+
+    def output_batch(batch):
+        for record in batch:
+            output_record(*record)
+
+    if PIPELINE:
+        pipeline = Pipeline(rows, [("convert", convert_batch), ("write", output_batch)])
+        pipeline.run()
+        instrumentation.pipeline(pipeline.report())
+        print(f"Pipeline: {pipeline.summary()}", file=sys.stderr)
+    else:
+        for i, row in rows:
+            output_record(i, row, *convert_record(i, row))
 
-    ### Specimen observations
+    if quarantine is not None:
+        quarantine.close()
 
-    identified_by = Person(
-        id=BNode().n3(), name=value(row["identifiedBy"]), in_dataset=record
-    )
+    if validator is not None:
+        with instrumentation.stage("validate"):
+            validator.close()
+        validator.write_report(VALIDATION_REPORT_FILENAME)
 
-    if value(row["typeStatus"]):
-        specimen_type_status_observation = Observation(
-            id=EX[str(uuid4())],
-            comment="specimen type status",
-            in_dataset=record,
-            was_associated_with=identified_by,
-            has_feature_of_interest=specimen,
-            has_simple_result=value(row["typeStatus"]),
-            has_result=Text(id=BNode().n3(), value=value(row["typeStatus"])),
-            observed_property="http://linked.data.gov.au/def/bdr-cv/specimen-type-status",
-            phenomenon_time=TimeInstant(
-                id=BNode().n3(),
-                date_timestamp=datetime.fromisoformat(
-                    f"{value(row['dateIdentified'])}-01-01"
-                ).isoformat(),
-            ),
-            result_time=datetime.fromisoformat(
-                f"{value(row['dateIdentified'])}-01-01"
-            ).isoformat(),
-            used_procedure=BDR_CV["specimen-method"],
+    if statistics is not None:
+        statistics.write(
+            GRAPH_NAME, f"{output_filename}.void.ttl", f"{output_filename}.stats.json"
         )
 
-        insert_data(
-            {**jsonld_context, **specimen_type_status_observation.dict(by_alias=True)},
-            g,
-        )
+    with instrumentation.stage("serialize"):
+        if stream:
+            writer.close()
+            if checkpoint is not None:
+                checkpoint.remove()
+            return None
+        return serialize(g, f"{output_filename}.ttl{compression}")
 
-    specimen_taxon_result_id = value(row["taxonConceptID"])
-    specimen_observation = Observation(
-        id=EX[str(uuid4())],
-        comment="specimen taxonomic information",
-        in_dataset=record,
-        was_associated_with=identified_by,
-        has_feature_of_interest=specimen,
-        has_simple_result=str(value(row["scientificName"])),
-        has_result=Taxon(
-            id=specimen_taxon_result_id,
-            in_dataset=record,
-            taxon_concept_id=value(row["taxonConceptID"]),
-            scientific_name=value(row["scientificName"]),
-            kingdom=value(row["kingdom"]),
-            phylum=value(row["phylum"]),
-            class_=value(row["class"]),
-            order=value(row["order"]),
-            family=value(row["family"]),
-            genus=value(row["genus"]),
-            specific_epithet=value(row["specificEpithet"]),
-            taxon_rank=value(row["taxonRank"]),
-            scientific_name_authorship=value(row["scientificNameAuthorship"]),
-            species=value(row["species"]),
-        ),
-        observed_property="http://linked.data.gov.au/def/tern-cv/70646576-6dc7-4bc5-a9d8-c4c366850df0",
-        phenomenon_time=TimeInstant(
-            id=BNode().n3(),
-            date_timestamp=datetime.fromisoformat(
-                f"{value(row['dateIdentified'])}-01-01"
-            ).isoformat(),
-        ),
-        result_time=datetime.fromisoformat(
-            f"{value(row['dateIdentified'])}-01-01"
-        ).isoformat(),
-        used_procedure=BDR_CV["specimen-method"],
-    )
 
-    new_jsonld_context = {**jsonld_context}
-    # new_jsonld_context["@context"][SOSA.hasSimpleResult] = {"@type": "@id"}
-    insert_data({**new_jsonld_context, **specimen_observation.dict(by_alias=True)}, g)
+def new_graph():
+    """Create the graph the records are added to when they are not streamed."""
+    if TRIPLE_BUFFER and not GRAPH_STORE:
+        return TripleBuffer()
+    return create_graph(GRAPH_STORE)
 
-    ### End of specimen observations
 
-    insert_data(
-        {
-            **jsonld_context,
-            **occurrence_sampling.dict(by_alias=True),
-        },
-        g,
-    )
-    insert_data(
-        {
-            **jsonld_context,
-            **specimen_sampling.dict(by_alias=True),
-        },
-        g,
-    )
+def serialize(g, filename):
+    """Write the graph as Turtle and return its size, closing it if it is on disk."""
+    write_graph(g, filename, "turtle")
+    graph_size = len(g)
+    if GRAPH_STORE:
+        g.close()
+    return graph_size
+
 
-if TRANSFORM_SINGLE_RECORD:
-    g.serialize("output-row-2.ttl", format="longturtle")
-else:
-    g.serialize("output.ttl", format="longturtle")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""Serve the converted output on a local, read-only SPARQL endpoint.
+
+The triples are loaded into memory (or read from a SQLite graph store) and
+queried at http://localhost:8000/sparql, with the results of repeated
+queries cached. The Ontodia viewer at http://localhost:8000/ browses them:
+
+    python serve.py output.ttl --port 8000
+"""
+
+import argparse
+
+from src.endpoint import QUERY_CACHE_SIZE, SparqlEndpoint, load_graph, make_server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "filenames",
+        nargs="+",
+        help="Turtle, N-Triples or N-Quads files, a record graphs directory "
+        "or a SQLite graph store",
+    )
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--cache-size", type=int, default=QUERY_CACHE_SIZE)
+    args = parser.parse_args()
+
+    graph = load_graph(args.filenames)
+    print(f"Loaded {len(graph)} triples.")
+    server = make_server(SparqlEndpoint(graph, args.cache_size), args.host, args.port)
+    print(f"Serving http://{args.host}:{args.port}/sparql")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,13 @@
-import json
 from urllib.parse import quote_plus
 
-import pandas as pd
-from rdflib import URIRef, Graph
-from rdflib.term import _is_valid_uri
-
-
-def value(cell):
-    if pd.isna(cell):
-        return None
-    return cell
-
 
 def create_uriref(uri):
     """Create a URIRef with the same validation func used by URIRef"""
+    # rdflib is imported here so that the package, e.g. the command line in
+    # src/cli.py, starts without it.
+    from rdflib import URIRef
+    from rdflib.term import _is_valid_uri
+
     if _is_valid_uri(uri):
         return URIRef(uri)
     return URIRef(quote_plus(uri))
-
-
-def insert_data(data: dict, graph: Graph):
-    graph.parse(data=json.dumps(data), format="json-ld")
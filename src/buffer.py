@@ -0,0 +1,144 @@
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from rdflib import RDF, VOID, BNode
+from rdflib.term import Node
+
+from src.emitter import Triple
+from src.namespaces import TERN
+from src.serializer import parse_ntriples
+
+
+class TripleBuffer:
+    """Keep triples in memory as integer ids of their terms, to write them out later.
+
+    Each distinct term is kept once, in a dictionary from the term to its
+    id, and the triples are three arrays of 4-byte ids. Predicates, types,
+    vocabulary terms and repeated literals, e.g. the licence, take no more
+    room than any other term, so a triple takes 12 bytes plus its share of
+    the terms, a fraction of what rdflib's in-memory store needs for its
+    indexes.
+
+    Triples are appended as they are added, duplicates included. When the
+    buffer is read, the ids are sorted by subject and the duplicates
+    dropped, and the triples are decoded to terms one record at a time.
+    """
+
+    def __init__(self):
+        self.ids: Dict[Node, int] = {}
+        self.terms: List[Node] = []
+        self.subjects = array("I")
+        self.predicates = array("I")
+        self.objects = array("I")
+        # The distinct triples, sorted, until another triple is added.
+        self.distinct: Optional[Tuple[np.ndarray, ...]] = None
+
+    def encode(self, term: Node) -> int:
+        i = self.ids.get(term)
+        if i is None:
+            i = self.ids[term] = len(self.terms)
+            self.terms.append(term)
+        return i
+
+    def add(self, triple: Triple):
+        s, p, o = triple
+        self.distinct = None
+        self.subjects.append(self.encode(s))
+        self.predicates.append(self.encode(p))
+        self.objects.append(self.encode(o))
+
+    def addN(self, quads: Iterable[tuple]):
+        for s, p, o, _ in quads:
+            self.add((s, p, o))
+
+    # The sink of rdflib's N-Triples parser.
+    def triple(self, s: Node, p: Node, o: Node):
+        self.add((s, p, o))
+
+    def parse(self, filename: str, format: str = "nt"):
+        """Add the triples of an N-Triples file, optionally compressed."""
+        if format != "nt":
+            raise ValueError("A triple buffer can only parse N-Triples.")
+        parse_ntriples(self, filename)
+
+    def columns(self):
+        """The subject, predicate and object ids of the distinct triples, and when they were added.
+
+        They are ordered by subject, and by when they were first added
+        within a subject, as rdflib keeps the triples of a subject. They
+        are kept until another triple is added.
+        """
+        if self.distinct is not None:
+            return self.distinct
+        s = np.frombuffer(self.subjects, dtype=np.uint32)
+        p = np.frombuffer(self.predicates, dtype=np.uint32)
+        o = np.frombuffer(self.objects, dtype=np.uint32)
+        order = np.lexsort((o, p, s))
+        distinct = np.ones(len(order), dtype=bool)
+        distinct[1:] = (
+            (s[order[1:]] != s[order[:-1]])
+            | (p[order[1:]] != p[order[:-1]])
+            | (o[order[1:]] != o[order[:-1]])
+        )
+        # The sort is stable, so the first of equal triples was added first.
+        order = order[distinct]
+        order = order[np.lexsort((order, s[order]))]
+        self.distinct = s[order], p[order], o[order], order
+        return self.distinct
+
+    def __len__(self) -> int:
+        return len(self.columns()[0])
+
+    def record_blocks(self) -> Iterator[List[Triple]]:
+        """Yield the triples of each record, then those of no record.
+
+        As src.streaming.record_blocks does for a graph, a record's triples
+        are those of the RDFDataset, of the entities in it and of the blank
+        nodes they reference, and entities in several records are only
+        yielded with the first.
+        """
+        s, p, o, added = self.columns()
+        if not len(s):
+            return
+        terms = self.terms
+        starts = np.flatnonzero(np.r_[True, s[1:] != s[:-1]])
+        ends = np.r_[starts[1:], len(s)]
+        first = np.full(len(terms), -1, dtype=np.int64)
+        first[s[starts]] = starts
+        last = np.zeros(len(terms), dtype=np.int64)
+        last[s[starts]] = ends
+        blank = np.array([isinstance(term, BNode) for term in terms], dtype=bool)
+        written = np.zeros(len(terms), dtype=bool)
+
+        def block(subjects):
+            triples = []
+            while subjects:
+                subject = subjects.pop()
+                if written[subject] or first[subject] < 0:
+                    continue
+                written[subject] = True
+                start, end = first[subject], last[subject]
+                node = terms[subject]
+                for predicate, obj in zip(p[start:end].tolist(), o[start:end].tolist()):
+                    triples.append((node, terms[predicate], terms[obj]))
+                    if blank[obj] and not written[obj]:
+                        subjects.append(obj)
+            return triples
+
+        in_dataset = self.ids.get(VOID.inDataset, -1)
+        rdf_type = self.ids.get(RDF.type, -1)
+        dataset = self.ids.get(TERN.RDFDataset, -1)
+
+        # Records, their entities and the other subjects are taken in the
+        # order they were added, as they are from a graph.
+        links = np.flatnonzero(p == in_dataset)
+        links = links[np.lexsort((added[links], o[links]))]
+        linked_records = o[links]
+        records = np.flatnonzero((p == rdf_type) & (o == dataset))
+        for record in s[records[np.argsort(added[records])]].tolist():
+            lo, hi = np.searchsorted(linked_records, [record, record + 1])
+            yield block([*s[links[lo:hi]].tolist(), record])
+        for subject in s[starts[np.argsort(added[starts])]].tolist():
+            if not written[subject]:
+                yield block([subject])
@@ -0,0 +1,76 @@
+import json
+import os
+import traceback
+from typing import NamedTuple, Optional
+
+import pandas as pd
+
+
+class State(NamedTuple):
+    """Progress of a conversion: rows done and the size of its output files."""
+
+    rows: int
+    output_size: int
+    quarantine_size: int
+
+
+class Checkpoint:
+    """The progress of a conversion saved in a JSON file to resume it after a crash.
+
+    The file is replaced atomically, so it is always either the previous or
+    the new checkpoint. Output written after a checkpoint is truncated when
+    resuming, and the rows after it are converted again.
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+
+    def load(self) -> Optional[State]:
+        if not os.path.exists(self.filename):
+            return None
+        with open(self.filename) as f:
+            return State(**json.load(f))
+
+    def save(self, state: State):
+        temporary = self.filename + ".tmp"
+        with open(temporary, "w") as f:
+            json.dump(state._asdict(), f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.filename)
+
+    def remove(self):
+        if os.path.exists(self.filename):
+            os.remove(self.filename)
+
+
+class Quarantine:
+    """Rows that failed to convert, written as JSON lines with their error."""
+
+    def __init__(self, filename: str, size: Optional[int] = None):
+        self.filename = filename
+        if not size:
+            self.file = open(filename, "w", encoding="utf-8")
+        else:
+            self.file = open(filename, "r+", encoding="utf-8")
+            self.file.truncate(size)
+            self.file.seek(size)
+
+    def add(self, row_number: int, row: pd.Series, error: Exception):
+        entry = {
+            "row": row_number,
+            "recordID": row.get("recordID"),
+            "error": type(error).__name__,
+            "message": str(error),
+            "traceback": "".join(traceback.format_exception(error)),
+            "values": row.to_dict(),
+        }
+        self.file.write(json.dumps(entry, default=str) + "\n")
+
+    def checkpoint(self) -> int:
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return self.file.tell()
+
+    def close(self):
+        self.file.close()
@@ -0,0 +1,224 @@
+"""Convert ALA records to TERN Ontology RDF from the command line.
+
+The records are written to the output as they are converted. A few records
+can be picked by their recordID or row number, e.g. to check how one of
+them converts:
+
+    python -m src records-2021-12-01.csv --format nt --record-id <recordID>
+
+Only the modules the options need are imported, and only once the arguments
+are parsed, so a run starts in a fraction of a second.
+"""
+
+import argparse
+import sys
+from time import perf_counter
+from typing import List, Optional, Set, Tuple
+
+FORMATS = ["turtle", "nt", "nquads", "record-graphs"]
+
+GRAPH_NAME = "https://doi.org/10.26197/ala.26fdc11f-107e-45fa-9aab-3aead9083137"
+
+
+def row_range(text: str) -> Tuple[int, Optional[int]]:
+    """Parse a row number, or a range of them as START:STOP, counted from 0.
+
+    Invalid ranges raise ArgumentTypeError, which argparse reports as a
+    usage error.
+    """
+    try:
+        if ":" not in text:
+            start, stop = int(text), int(text) + 1
+        else:
+            first, last = text.split(":", 1)
+            start, stop = int(first or 0), int(last) if last else None
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"{text!r} is not a row number or a START:STOP range."
+        )
+    if start < 0 or (stop is not None and stop < 0):
+        raise argparse.ArgumentTypeError(f"{text!r}: rows are counted from 0.")
+    if stop is not None and stop <= start:
+        raise argparse.ArgumentTypeError(f"{text!r}: STOP must be after START.")
+    return start, stop
+
+
+def parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m src", description=__doc__.splitlines()[0]
+    )
+    parser.add_argument(
+        "input", help="CSV (optionally compressed), Parquet or Arrow file"
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        help="output file, output.<format extension> by default, or a directory "
+        "for record graphs",
+    )
+    parser.add_argument("-f", "--format", choices=FORMATS, default="turtle")
+    parser.add_argument("--compression", choices=["gz", "zst"])
+    parser.add_argument(
+        "--record-id",
+        action="append",
+        dest="record_ids",
+        metavar="RECORD_ID",
+        help="convert only the record with this recordID (repeatable)",
+    )
+    parser.add_argument(
+        "--rows",
+        type=row_range,
+        metavar="N|START:STOP",
+        help="convert only this row, or the rows from START up to STOP",
+    )
+    parser.add_argument(
+        "--mapping", help="convert with a mapping table, e.g. mapping.csv"
+    )
+    parser.add_argument(
+        "--strict",
+        action="store_true",
+        help="build the records with the validated pydantic models",
+    )
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--chunk-size", type=int, default=10_000)
+    parser.add_argument("--intern-cache-size", type=int, default=0)
+    parser.add_argument(
+        "--site-radius",
+        type=float,
+        help="merge co-located records into sites within this many metres",
+    )
+    parser.add_argument(
+        "--graph-name", default=GRAPH_NAME, help="named graph of N-Quads output"
+    )
+    parser.add_argument("--report", help="write a JSON report of the run")
+    parser.add_argument(
+        "--progress", type=int, default=0, metavar="N", help="report every N rows"
+    )
+    return parser
+
+
+def output_filename(args: argparse.Namespace) -> str:
+    from src.streaming import FORMATS as EXTENSIONS
+
+    if args.output:
+        return args.output
+    # Record graph shards are always gzip compressed.
+    if args.compression and args.format != "record-graphs":
+        return f"output.{EXTENSIONS[args.format]}.{args.compression}"
+    return f"output.{EXTENSIONS[args.format]}"
+
+
+def select_records(record_ids: Set[str]):
+    """Select the rows of a chunk that have one of ``record_ids``."""
+
+    def select(chunk):
+        return chunk["recordID"].astype(str).isin(record_ids)
+
+    return select
+
+
+def convert(args: argparse.Namespace, output: str) -> Tuple[int, int]:
+    """Convert the selected records of the input, returning how many and their triples."""
+    from rdflib import URIRef
+
+    from src import instrumentation
+    from src.interning import InternCache
+    from src.readers import mapped_columns
+    from src.streaming import iter_rows, open_writer
+
+    cache = InternCache(args.intern_cache_size) if args.intern_cache_size else None
+    if args.mapping:
+        from src.mapping import load_mapping
+
+        mapping = load_mapping(args.mapping)
+        columns = mapped_columns(mapping)
+
+        def convert_row(row):
+            return mapping.convert(row, cache)
+
+    else:
+        from src.convert import convert_row as convert_model_row
+
+        columns = mapped_columns()
+
+        def convert_row(row):
+            return convert_model_row(row, cache, args.strict)
+
+    sites = None
+    if args.site_radius:
+        from src.sites import SiteIndex
+
+        sites = SiteIndex(args.site_radius)
+
+    record_ids = set(args.record_ids or ())
+    select = select_records(record_ids) if record_ids else None
+    start, stop = args.rows or (0, None)
+    rows = iter_rows(args.input, args.chunk_size, start, stop, columns, sites, select)
+
+    found = set()
+    n_records = n_triples = 0
+    with open_writer(output, args.format, URIRef(args.graph_name)) as writer:
+        for _, row in instrumentation.timed("read", rows):
+            with instrumentation.stage("convert"):
+                triples = convert_row(row)
+            with instrumentation.stage("write"):
+                writer.write(triples)
+            instrumentation.record(len(triples))
+            n_records += 1
+            n_triples += len(triples)
+            # A recordID is only in one row, so the rest of the file is
+            # not read once every record was found.
+            if record_ids:
+                found.add(str(row["recordID"]))
+                if found >= record_ids:
+                    break
+
+    for record_id in sorted(record_ids - found):
+        print(f"Record {record_id!r} not found.", file=sys.stderr)
+    return n_records, n_triples
+
+
+def convert_parallel(args: argparse.Namespace, output: str):
+    from rdflib import URIRef
+
+    from src.parallel import parallel_convert
+
+    parallel_convert(
+        args.input,
+        output,
+        args.format,
+        args.workers,
+        URIRef(args.graph_name),
+        chunksize=args.chunk_size,
+        intern_cache_size=args.intern_cache_size,
+        mapping_filename=args.mapping,
+        site_radius=args.site_radius,
+        strict=args.strict,
+    )
+
+
+def main(argv: Optional[List[str]] = None):
+    arguments = parser()
+    args = arguments.parse_args(argv)
+    if args.workers > 1 and (args.record_ids or args.rows):
+        arguments.error("--record-id and --rows convert in one process only.")
+
+    from src import instrumentation
+
+    start = perf_counter()
+    if args.report or args.progress:
+        instrumentation.enable(args.progress)
+    output = output_filename(args)
+    if args.workers > 1:
+        with instrumentation.stage("parallel"):
+            convert_parallel(args, output)
+        print(f"Converted {args.input} to {output}", file=sys.stderr)
+    else:
+        n_records, n_triples = convert(args, output)
+        print(
+            f"Converted {n_records} records ({n_triples} triples) to {output} "
+            f"in {perf_counter() - start:.2f}s",
+            file=sys.stderr,
+        )
+    if args.report:
+        instrumentation.active.write_report(args.report)
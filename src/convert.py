@@ -0,0 +1,459 @@
+from enum import Enum
+from time import perf_counter
+from typing import List, NamedTuple, Optional, Set
+
+import pandas as pd
+from rdflib import VOID
+
+from src import create_uriref, entities, instrumentation
+from src import models as validated_models
+from src.emitter import Triple, model_to_triples, to_node
+from src.entities import Model
+from src.identifiers import mint_bnode, mint_iri, mint_shared_bnode, mint_uuid
+from src.interning import InternCache
+from src.namespaces import EX, BDR_CV
+
+
+class StateOrTerritory(Enum):
+    WA = "http://linked.data.gov.au/dataset/asgs2016/stateorterritory/5"
+
+
+# Columns of the ALA download read by build_models, besides the ones derived
+# by preprocess.
+COLUMNS = [
+    "recordID",
+    "collectionCode",
+    "countryCode",
+    "provenance",
+    "recordedBy",
+    "coordinateUncertaintyInMeters",
+    "locationRemarks",
+    "occurrenceID",
+    "fieldNumber",
+    "samplingProtocol",
+    "preparations",
+    "sex",
+    "lifeStage",
+    "habitat",
+    "identifiedBy",
+    "typeStatus",
+    "taxonConceptID",
+    "scientificName",
+    "kingdom",
+    "phylum",
+    "class",
+    "order",
+    "family",
+    "genus",
+    "specificEpithet",
+    "taxonRank",
+    "scientificNameAuthorship",
+    "species",
+]
+
+
+class RecordModels(NamedTuple):
+    """The models built for one record."""
+
+    record: Model
+    models: List[Model]
+    # Ids of the interned entities already emitted for an earlier record.
+    seen: Set[str]
+    # Interned entities the record is linked to.
+    shared: List[Model]
+
+
+def to_triples(record_models: RecordModels) -> List[Triple]:
+    """Emit the triples of a record's models, each node only once."""
+    seen = record_models.seen
+    triples = []
+    for model in record_models.models:
+        if model.id not in seen:
+            if instrumentation.active is None:
+                triples.extend(model_to_triples(model, seen))
+            else:
+                start = perf_counter()
+                triples.extend(model_to_triples(model, seen))
+                instrumentation.active.entity(
+                    type(model).__name__, perf_counter() - start
+                )
+
+    record_node = to_node(record_models.record.id)
+    triples.extend(
+        (node, VOID.inDataset, record_node)
+        for node in dict.fromkeys(to_node(entity.id) for entity in record_models.shared)
+    )
+    return triples
+
+
+def intern(cache: InternCache, key, factory, seen: Set[str], shared: List[Model]):
+    """Get an entity from the cache, building it on a miss, and add it to ``shared``.
+
+    Entities built for an earlier record are added to ``seen``, so the record
+    only references them instead of emitting their triples again.
+    """
+    entity, created = cache.get(key, factory)
+    if not created and all(entity is not other for other in shared):
+        seen.add(entity.id)
+    shared.append(entity)
+    return entity
+
+
+def vocabulary_term(code: str, cache: Optional[InternCache]) -> str:
+    if cache is None:
+        return BDR_CV[create_uriref(code)]
+    return cache.get(("vocabulary", code), lambda: BDR_CV[create_uriref(code)])[0]
+
+
+def convert_row(
+    row: pd.Series, cache: Optional[InternCache] = None, strict: bool = False
+) -> List[Triple]:
+    """Convert one ALA record to the triples of its TERN Ontology entities."""
+    return to_triples(build_models(row, cache, strict))
+
+
+def build_models(
+    row: pd.Series, cache: Optional[InternCache] = None, strict: bool = False
+) -> RecordModels:
+    """Build the TERN Ontology models of one ALA record.
+
+    With a ``cache``, persons, taxa and vocabulary terms are interned: they
+    are built and emitted once, and each record is linked to them with
+    void:inDataset. Persons are then identified by name across records.
+
+    The entities are the fast ones of src/entities.py, or with ``strict``
+    the pydantic models of src/models.py, which validate every field.
+    """
+    m = validated_models if strict else entities
+    models = []
+    seen = set()
+    shared = []
+    record_id = row["recordID"]
+
+    def person(name: Optional[str], role: str) -> Model:
+        # Persons without a name are never interned, or every one of them
+        # would be the same person.
+        if cache is None or name is None:
+            return m.Person(
+                id=mint_bnode(record_id, role), name=name, in_dataset=record
+            )
+        return intern(
+            cache,
+            ("person", name),
+            lambda: m.Person(id=mint_shared_bnode("person", name), name=name),
+            seen,
+            shared,
+        )
+
+    ### RDFDataset (Record)
+
+    attr_country_code = m.Attribute(
+        id=mint_bnode(record_id, "country-code-attribute"),
+        attribute=BDR_CV["country-code"],
+        has_simple_value=row["countryCode"],
+        has_value=m.Text(
+            id=mint_bnode(record_id, "country-code-value"),
+            value=row["countryCode"],
+        ),
+    )
+
+    attr_provenance = m.Attribute(
+        id=mint_bnode(record_id, "provenance-attribute"),
+        attribute=BDR_CV["provenance"],
+        has_simple_value=row["provenance"],
+        has_value=m.Text(
+            id=mint_bnode(record_id, "provenance-value"), value=row["provenance"]
+        ),
+    )
+
+    record = m.RDFDataset(
+        id=mint_iri(record_id, "record"),
+        identifier=row["recordID"],
+        license="https://creativecommons.org/licenses/by/4.0/",
+        subject=vocabulary_term(row["collectionCode"], cache),
+        source="https://doi.org/10.26197/ala.26fdc11f-107e-45fa-9aab-3aead9083137",
+        rights_holder="https://museum.wa.gov.au/",
+        has_attribute=[attr_country_code, attr_provenance],
+        comment="Equivalent to dwc:Record.",
+    )
+
+    ### End RDFDataset (Record)
+
+    recorded_by = person(row["recordedBy"], "recorded-by")
+
+    occurrence_sampling_datetime = row["_result_time"]
+
+    ### Site
+
+    # Records merged into one site by a SiteIndex share the site of the
+    # first record, which is emitted with that record only.
+    site_record_id = row.get("_site") or record_id
+    site_establishment_uri = mint_iri(site_record_id, "site-establishment")
+    site_uri = "https://linked.data.gov.au/dataset/bdr/site/" + mint_uuid(
+        site_record_id, "site"
+    )
+
+    site_point = m.Geometry(
+        id=mint_bnode(site_record_id, "site-point"),
+        as_wkt=row["_wkt"],
+        elevation=row["_elevation"],
+        has_metric_spatial_accuracy=row["coordinateUncertaintyInMeters"],
+    )
+
+    site = m.Site(
+        id=site_uri,
+        feature_type="http://linked.data.gov.au/def/tern-cv/5bf7ae21-a454-440b-bdd7-f2fe982d8de4",
+        identifier=site_uri,
+        is_sample_of=StateOrTerritory.WA.value,
+        is_result_of=site_establishment_uri,
+        location_description=row["locationRemarks"],
+        in_dataset=record,
+        has_geometry=site_point,
+    )
+
+    site_establishment = m.Sampling(
+        id=site_establishment_uri,
+        comment="Site establishment",
+        has_feature_of_interest=site,
+        was_associated_with=recorded_by,
+        used_procedure=EX["site-establishment-method"],
+        result_time=occurrence_sampling_datetime,
+        has_result=site,
+        in_dataset=record,
+    )
+
+    site_visit = m.SiteVisit(
+        id=mint_iri(record_id, "site-visit"),
+        started_at_time=occurrence_sampling_datetime,
+        has_site=site,
+        in_dataset=record,
+    )
+
+    models.append(site)
+    models.append(site_establishment)
+    models.append(site_visit)
+
+    if site_record_id != record_id:
+        seen.update((site.id, site_establishment.id))
+        shared.extend((site, site_establishment))
+
+    ### End Site
+
+    ### Occurrence sampling
+
+    occurrence_sampling_id = mint_iri(record_id, "occurrence-sampling")
+
+    occurrence = m.Sample(
+        id=mint_iri(record_id, "occurrence"),
+        identifier=row["occurrenceID"],
+        comment="occurrence",
+        is_sample_of=site,
+        is_result_of=occurrence_sampling_id,
+        feature_type="http://linked.data.gov.au/def/tern-cv/2361dea8-598c-4b6f-a641-2b98ff199e9e",
+        in_dataset=record,
+    )
+
+    occurrence_sampling = m.Sampling(
+        id=occurrence_sampling_id,
+        identifier=row["fieldNumber"],
+        has_feature_of_interest=site,
+        sampling_type=(
+            vocabulary_term(row["samplingProtocol"], cache)
+            if row["samplingProtocol"]
+            else None
+        ),
+        sf_within=[
+            "https://sws.geonames.org/2077456/",
+            StateOrTerritory.WA.value,
+        ],
+        result_time=occurrence_sampling_datetime,
+        comment=row["locationRemarks"],
+        was_associated_with=recorded_by,
+        has_result=occurrence,
+        used_procedure=EX["occurrence-method"],
+        in_dataset=record,
+    )
+
+    ### End of occurrence sampling
+
+    ### Specimen sampling
+
+    specimen_sampling_id = mint_iri(record_id, "specimen-sampling")
+
+    specimen = m.MaterialSample(
+        id=mint_iri(record_id, "specimen"),
+        comment="specimen",
+        is_sample_of=occurrence.id,
+        is_result_of=specimen_sampling_id,
+        feature_type="http://linked.data.gov.au/def/tern-cv/cd5cbdbb-07d9-4a5b-9b11-5ab9d6015be6",
+        in_dataset=record,
+    )
+
+    specimen_sampling = m.Sampling(
+        id=specimen_sampling_id,
+        used_procedure=m.Procedure(
+            id=EX["specimen-sampling"], description=row["preparations"]
+        ),
+        result_time=occurrence_sampling_datetime,
+        was_associated_with=recorded_by,
+        has_result=specimen,
+        has_feature_of_interest=occurrence,
+        in_dataset=record,
+    )
+
+    ### End of specimen sampling
+
+    ### Occurrence observations
+
+    if row["sex"]:
+        sex_observation = m.Observation(
+            id=mint_iri(record_id, "sex-observation"),
+            comment="Sex of the occurrence.",
+            in_dataset=record,
+            was_associated_with=recorded_by,
+            has_feature_of_interest=occurrence,
+            has_simple_result=row["sex"],
+            has_result=m.Text(
+                id=mint_bnode(record_id, "sex-observation-result"),
+                value=row["sex"],
+            ),
+            observed_property="http://linked.data.gov.au/def/tern-cv/05cbf534-c233-4aa8-a08c-00b28976ed36",
+            phenomenon_time=m.TimeInstant(
+                id=mint_bnode(record_id, "sex-observation-phenomenon-time"),
+                date_timestamp=occurrence_sampling_datetime,
+            ),
+            result_time=occurrence_sampling_datetime,
+            used_procedure=BDR_CV["occurrence-method"],
+        )
+
+        models.append(sex_observation)
+
+    life_stage_observation = m.Observation(
+        id=mint_iri(record_id, "life-stage-observation"),
+        comment="life stage of the occurrence.",
+        in_dataset=record,
+        was_associated_with=recorded_by,
+        has_feature_of_interest=occurrence,
+        has_simple_result=row["lifeStage"],
+        has_result=m.Text(
+            id=mint_bnode(record_id, "life-stage-observation-result"),
+            value=row["lifeStage"],
+        ),
+        observed_property="http://linked.data.gov.au/def/tern-cv/abb0ee19-b2e8-42f3-8a25-d1f39ca3ebc3",
+        phenomenon_time=m.TimeInstant(
+            id=mint_bnode(record_id, "life-stage-observation-phenomenon-time"),
+            date_timestamp=occurrence_sampling_datetime,
+        ),
+        result_time=occurrence_sampling_datetime,
+        used_procedure=BDR_CV["occurrence-method"],
+    )
+
+    models.append(life_stage_observation)
+
+    habitat_observation = m.Observation(
+        id=mint_iri(record_id, "habitat-observation"),
+        comment="habitat of the occurrence.",
+        in_dataset=record,
+        was_associated_with=recorded_by,
+        has_feature_of_interest=occurrence,
+        has_simple_result=str(row["habitat"]),
+        has_result=m.Text(
+            id=mint_bnode(record_id, "habitat-observation-result"),
+            value=row["habitat"],
+        ),
+        observed_property="http://linked.data.gov.au/def/tern-cv/2090cfd9-8b6b-497b-9512-497456a18b99",
+        phenomenon_time=m.TimeInstant(
+            id=mint_bnode(record_id, "habitat-observation-phenomenon-time"),
+            date_timestamp=occurrence_sampling_datetime,
+        ),
+        result_time=occurrence_sampling_datetime,
+        used_procedure=BDR_CV["occurrence-method"],
+    )
+
+    models.append(habitat_observation)
+
+    ### End of occurrence observations
+
+    ### Specimen observations
+
+    identified_by = person(row["identifiedBy"], "identified-by")
+
+    date_identified = row["_date_identified"]
+
+    if row["typeStatus"]:
+        specimen_type_status_observation = m.Observation(
+            id=mint_iri(record_id, "type-status-observation"),
+            comment="specimen type status",
+            in_dataset=record,
+            was_associated_with=identified_by,
+            has_feature_of_interest=specimen,
+            has_simple_result=row["typeStatus"],
+            has_result=m.Text(
+                id=mint_bnode(record_id, "type-status-observation-result"),
+                value=row["typeStatus"],
+            ),
+            observed_property="http://linked.data.gov.au/def/bdr-cv/specimen-type-status",
+            phenomenon_time=m.TimeInstant(
+                id=mint_bnode(record_id, "type-status-observation-phenomenon-time"),
+                date_timestamp=date_identified,
+            ),
+            result_time=date_identified,
+            used_procedure=BDR_CV["specimen-method"],
+        )
+
+        models.append(specimen_type_status_observation)
+
+    def taxon(in_dataset: Optional[Model]) -> Model:
+        return m.Taxon(
+            id=row["taxonConceptID"],
+            in_dataset=in_dataset,
+            taxon_concept_id=row["taxonConceptID"],
+            scientific_name=row["scientificName"],
+            kingdom=row["kingdom"],
+            phylum=row["phylum"],
+            class_=row["class"],
+            order=row["order"],
+            family=row["family"],
+            genus=row["genus"],
+            specific_epithet=row["specificEpithet"],
+            taxon_rank=row["taxonRank"],
+            scientific_name_authorship=row["scientificNameAuthorship"],
+            species=row["species"],
+        )
+
+    if cache is None:
+        specimen_taxon = taxon(record)
+    else:
+        specimen_taxon = intern(
+            cache,
+            ("taxon", row["taxonConceptID"]),
+            lambda: taxon(None),
+            seen,
+            shared,
+        )
+
+    specimen_observation = m.Observation(
+        id=mint_iri(record_id, "taxon-observation"),
+        comment="specimen taxonomic information",
+        in_dataset=record,
+        was_associated_with=identified_by,
+        has_feature_of_interest=specimen,
+        has_simple_result=str(row["scientificName"]),
+        has_result=specimen_taxon,
+        observed_property="http://linked.data.gov.au/def/tern-cv/70646576-6dc7-4bc5-a9d8-c4c366850df0",
+        phenomenon_time=m.TimeInstant(
+            id=mint_bnode(record_id, "taxon-observation-phenomenon-time"),
+            date_timestamp=date_identified,
+        ),
+        result_time=date_identified,
+        used_procedure=BDR_CV["specimen-method"],
+    )
+
+    models.append(specimen_observation)
+
+    ### End of specimen observations
+
+    models.append(occurrence_sampling)
+    models.append(specimen_sampling)
+
+    return RecordModels(record, models, seen, shared)
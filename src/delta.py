@@ -0,0 +1,261 @@
+import os
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    TextIO,
+    Tuple,
+)
+
+import pandas as pd
+from rdflib import RDF, SOSA, VOID
+from rdflib.plugins.serializers.nt import _nt_row
+
+from src.convert import convert_row
+from src.emitter import Triple
+from src.mapping import load_mapping
+from src.namespaces import TERN
+from src.preprocess import preprocess
+from src.readers import mapped_columns, read_chunks
+from src.serializer import open_text
+
+# Entities shared by the records that refer to them. Their triples, apart
+# from their void:inDataset link to each record, are counted by the records
+# that produce them, and only deleted by a patch once none does.
+SHARED_TYPES = {TERN.Taxon, SOSA.Procedure}
+
+# Index of a snapshot, kept next to it and reused as the previous index.
+INDEX_SUFFIX = ".index.tsv.gz"
+
+# Counts of the triples of shared entities of a snapshot, kept next to it.
+SHARED_SUFFIX = ".shared.tsv.gz"
+
+
+def index_filename(snapshot: str) -> str:
+    return snapshot + INDEX_SUFFIX
+
+
+def shared_filename(snapshot: str) -> str:
+    return snapshot + SHARED_SUFFIX
+
+
+def hash_rows(chunk: pd.DataFrame) -> pd.Series:
+    """Hash the values of each row of a chunk, read as text, to 16 hex digits."""
+    hashes = pd.util.hash_pandas_object(chunk.astype(str), index=False)
+    return hashes.map("{:016x}".format)
+
+
+def read_index(filename: str) -> Dict[str, str]:
+    """Read an index of recordID to row hash written by write_index."""
+    with open_text(filename, "r") as f:
+        return dict(line.rstrip("\n").split("\t") for line in f)
+
+
+def write_index(index: Dict[str, str], filename: str):
+    with open_text(filename) as f:
+        f.writelines(
+            f"{record_id}\t{row_hash}\n" for record_id, row_hash in index.items()
+        )
+
+
+def build_index(
+    filename: str, columns: List[str], chunksize: int = 100_000
+) -> Dict[str, str]:
+    """Hash every row of a snapshot, keyed by recordID, without converting it."""
+    index = {}
+    for chunk in read_chunks(filename, columns, chunksize):
+        index.update(zip(chunk["recordID"].astype(str), hash_rows(chunk)))
+    return index
+
+
+def changed_rows(
+    filename: str,
+    columns: List[str],
+    chunksize: int,
+    select: Callable[[pd.DataFrame], pd.Series],
+) -> Iterator[pd.Series]:
+    """Yield the preprocessed rows of a snapshot that ``select`` is true for.
+
+    Only the selected rows of each chunk are preprocessed.
+    """
+    for chunk in read_chunks(filename, columns, chunksize):
+        selected = chunk[select(chunk)]
+        if len(selected):
+            for _, row in preprocess(selected).iterrows():
+                yield row
+
+
+def split_shared(triples: List[Triple]) -> Tuple[Dict[Triple, None], Set[str]]:
+    """Split the triples of a record into those it owns and those of shared entities.
+
+    The triples it owns, including the void:inDataset links of the shared
+    entities to it, are added and deleted with it. The others are returned
+    as N-Triples rows, to be counted.
+    """
+    shared = {s for s, p, o in triples if p == RDF.type and o in SHARED_TYPES}
+    owned: Dict[Triple, None] = {}
+    rows = set()
+    for s, p, o in triples:
+        if s in shared and p != VOID.inDataset:
+            rows.add(_nt_row((s, p, o)))
+        else:
+            owned[(s, p, o)] = None
+    return owned, rows
+
+
+def read_counts(filename: str) -> Dict[str, int]:
+    """Read the counts of shared triples written by write_counts."""
+    counts = {}
+    with open_text(filename, "r") as f:
+        for line in f:
+            n, row = line.split("\t", 1)
+            counts[row] = int(n)
+    return counts
+
+
+def write_counts(counts: Dict[str, int], filename: str):
+    with open_text(filename) as f:
+        f.writelines(f"{n}\t{row}" for row, n in counts.items())
+
+
+def build_counts(
+    filename: str, columns: List[str], chunksize: int, convert: Callable
+) -> Dict[str, int]:
+    """Count the records of a snapshot that produce each triple of its shared entities.
+
+    Every row is converted, so this is only done for a snapshot without
+    counts, e.g. the first one a patch is written against.
+    """
+    counts: Dict[str, int] = {}
+    rows = changed_rows(
+        filename, columns, chunksize, lambda chunk: pd.Series(True, index=chunk.index)
+    )
+    for row in rows:
+        for shared_row in split_shared(convert(row))[1]:
+            counts[shared_row] = counts.get(shared_row, 0) + 1
+    return counts
+
+
+def write_patch_rows(f: TextIO, operation: str, triples: Iterable[Triple]):
+    f.writelines(f"{operation} {_nt_row(triple)}" for triple in triples)
+
+
+def delta_convert(
+    previous_filename: str,
+    current_filename: str,
+    output_filename: str,
+    mapping_filename: Optional[str] = None,
+    chunksize: int = 10_000,
+) -> Dict[str, int]:
+    """Write the changes between two snapshots of the ALA download as an RDF Patch.
+
+    Rows are keyed by recordID and compared by a hash of their mapped
+    columns. The index of hashes of the current snapshot is written next to
+    it, and the one of the previous snapshot is read if it exists, else it
+    is built from the previous snapshot. Only added and changed rows are
+    converted, and only the previous rows of changed and deleted records.
+
+    The patch is one transaction that deletes the triples of changed and
+    deleted records that are no longer produced, and adds the triples of
+    added and changed records (https://afs.github.io/rdf-delta/rdf-patch.html).
+    Records are converted without interning, so each record owns its
+    entities apart from those of SHARED_TYPES. The triples of those are
+    counted by the records that produce them, with the counts kept next to
+    each snapshot as its index is, and are deleted once no record does, so
+    a changed attribute of a taxon, or a taxon no record refers to any
+    more, leaves no stale triples behind. Without the counts of the previous
+    snapshot, it is converted in full once to build them.
+
+    Returns the number of added, changed, deleted and unchanged records.
+    """
+    mapping = load_mapping(mapping_filename) if mapping_filename else None
+    convert = convert_row if mapping is None else mapping.convert
+    columns = mapped_columns(mapping)
+
+    previous_index_filename = index_filename(previous_filename)
+    if os.path.exists(previous_index_filename):
+        previous_index = read_index(previous_index_filename)
+    else:
+        previous_index = build_index(previous_filename, columns)
+    previous_shared_filename = shared_filename(previous_filename)
+    if os.path.exists(previous_shared_filename):
+        counts = read_counts(previous_shared_filename)
+    else:
+        counts = build_counts(previous_filename, columns, chunksize, convert)
+    # The count of each shared triple before the patch, once it changes.
+    touched: Dict[str, int] = {}
+
+    def count(rows: Set[str], n: int):
+        for row in rows:
+            touched.setdefault(row, counts.get(row, 0))
+            counts[row] = counts.get(row, 0) + n
+
+    index: Dict[str, str] = {}
+    changed: Set[str] = set()
+
+    def select_current(chunk: pd.DataFrame) -> pd.Series:
+        record_ids = chunk["recordID"].astype(str)
+        hashes = hash_rows(chunk)
+        index.update(zip(record_ids, hashes))
+        previous = record_ids.map(previous_index)
+        changed.update(record_ids[previous.notna() & (previous != hashes)])
+        return previous != hashes
+
+    records = {"added": 0, "changed": 0, "deleted": 0, "unchanged": 0}
+    # The triples of changed records are kept until their previous triples
+    # are known, so that the triples in both are neither deleted nor added.
+    added: Dict[str, Dict[Triple, None]] = {}
+    with open_text(output_filename) as f:
+        f.write("TX .\n")
+        for row in changed_rows(current_filename, columns, chunksize, select_current):
+            record_id = str(row["recordID"])
+            owned, shared = split_shared(convert(row))
+            count(shared, 1)
+            if record_id in changed:
+                added[record_id] = owned
+            else:
+                write_patch_rows(f, "A", owned)
+                records["added"] += 1
+
+        deleted = previous_index.keys() - index.keys()
+        removed = changed | deleted
+        rows = changed_rows(
+            previous_filename,
+            columns,
+            chunksize,
+            lambda chunk: chunk["recordID"].astype(str).isin(removed),
+        )
+        for row in rows:
+            record_id = str(row["recordID"])
+            previous, shared = split_shared(convert(row))
+            count(shared, -1)
+            current = added.pop(record_id, {})
+            write_patch_rows(f, "D", (t for t in previous if t not in current))
+            write_patch_rows(f, "A", (t for t in current if t not in previous))
+            records["changed" if record_id in changed else "deleted"] += 1
+        # Changed records missing from the previous snapshot, e.g. if it was
+        # edited after its index was written, are added in full.
+        for record_id, triples in added.items():
+            write_patch_rows(f, "A", triples)
+            records["changed"] += 1
+
+        # The triples of shared entities that no record produced before are
+        # added, and those no record produces any more are deleted.
+        for row, before in touched.items():
+            after = counts[row]
+            if after <= 0:
+                del counts[row]
+            if before <= 0 < after:
+                f.write(f"A {row}")
+            elif after <= 0 < before:
+                f.write(f"D {row}")
+        f.write("TC .\n")
+
+    write_index(index, index_filename(current_filename))
+    write_counts(counts, shared_filename(current_filename))
+    records["unchanged"] = len(index) - records["added"] - records["changed"]
+    return records
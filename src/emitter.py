@@ -0,0 +1,96 @@
+from functools import lru_cache
+from typing import Dict, Iterator, Optional, Set, Tuple, Type, Union
+
+from pydantic import BaseModel
+from rdflib import RDF, XSD, BNode, Literal, URIRef
+from rdflib.term import Node
+
+from src.entities import Entity, Model
+from src.jsonld_context import jsonld_context
+
+Triple = Tuple[Node, Node, Node]
+
+# Predicate IRI -> "@id" or datatype IRI, as declared in the JSON-LD context.
+coercions = {
+    str(predicate): definition["@type"]
+    for predicate, definition in jsonld_context["@context"].items()
+}
+datatypes = {
+    predicate: URIRef(coercion)
+    for predicate, coercion in coercions.items()
+    if coercion != "@id"
+}
+
+# Predicate nodes by field alias, made once rather than for every triple.
+predicates: Dict[str, URIRef] = {}
+
+
+def to_node(id_: str) -> Optional[Union[URIRef, BNode]]:
+    """Convert an "@id" value to a node the same way the JSON-LD parser does."""
+    if id_.startswith("_:"):
+        return BNode(id_[2:])
+    if ":" not in id_:
+        return None
+    return URIRef(id_)
+
+
+def to_object(predicate: str, obj) -> Optional[Node]:
+    coercion = coercions.get(predicate)
+    if coercion == "@id":
+        return to_node(obj) if isinstance(obj, str) else None
+    if coercion is not None:
+        return Literal(obj, datatype=datatypes[predicate])
+    if isinstance(obj, float):
+        return Literal(obj, datatype=XSD.double)
+    return Literal(obj)
+
+
+@lru_cache(maxsize=None)
+def pydantic_fields(model_class: Type[BaseModel]) -> Tuple[Tuple[str, str], ...]:
+    return tuple((field.name, field.alias) for field in model_class.__fields__.values())
+
+
+def model_fields(model: Model) -> Tuple[Tuple[str, str], ...]:
+    """The (name, alias) of the fields of a model or entity."""
+    if isinstance(model, Entity):
+        return model.fields
+    return pydantic_fields(type(model))
+
+
+def model_to_triples(model: Model, seen: Set[str] = None) -> Iterator[Triple]:
+    """Yield the triples of a model and its nested models.
+
+    The output is the same as serializing the model with the JSON-LD context
+    and parsing it back into a graph. Nested models whose id is already in
+    ``seen`` are only referenced, not emitted again.
+    """
+    if seen is None:
+        seen = set()
+    seen.add(model.id)
+
+    subject = to_node(model.id)
+    if subject is None:
+        return
+
+    for name, alias in model_fields(model):
+        value = getattr(model, name)
+        if value is None or alias == "@id":
+            continue
+        if alias == "@type":
+            yield subject, RDF.type, URIRef(value)
+            continue
+
+        predicate = predicates.get(alias)
+        if predicate is None:
+            predicate = predicates[alias] = URIRef(alias)
+        for item in value if isinstance(value, list) else [value]:
+            if isinstance(item, (BaseModel, Entity)):
+                obj = to_node(item.id)
+                if obj is not None:
+                    yield subject, predicate, obj
+                if item.id not in seen:
+                    yield from model_to_triples(item, seen)
+            elif item is not None:
+                obj = to_object(alias, item)
+                if obj is not None:
+                    yield subject, predicate, obj
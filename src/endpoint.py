@@ -0,0 +1,197 @@
+import json
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from rdflib import Dataset, Graph
+from rdflib.plugins.sparql import prepareQuery
+from rdflib.util import guess_format
+
+from src.interning import InternCache
+from src.serializer import open_text
+from src.store import open_sqlite_graph
+
+# Query results kept, by query text and Accept header.
+QUERY_CACHE_SIZE = 1024
+
+# Media types of the results of SELECT and ASK queries, and of CONSTRUCT and
+# DESCRIBE queries, with the rdflib format they are serialized with. The
+# first one is the default.
+RESULT_FORMATS = {
+    "application/sparql-results+json": "json",
+    "application/sparql-results+xml": "xml",
+    "text/csv": "csv",
+    "text/tab-separated-values": "tsv",
+}
+GRAPH_FORMATS = {
+    "text/turtle": "turtle",
+    "application/n-triples": "nt",
+    "application/ld+json": "json-ld",
+    "application/rdf+xml": "xml",
+}
+
+VIEWER = os.path.join(os.path.dirname(__file__), "..", "ontodia", "index.html")
+
+
+def load_graph(filenames: List[str]) -> Graph:
+    """Load the output of the conversion to query it.
+
+    A SQLite graph store (.sqlite or .db) is opened as it is. Other files are
+    parsed into one in-memory dataset, whose stores index the triples by
+    subject, predicate and object as they are loaded. Files may be gzip or
+    zstd compressed, and a directory is read as the shards of record graphs.
+    """
+    if len(filenames) == 1 and filenames[0].endswith((".sqlite", ".db")):
+        return open_sqlite_graph(filenames[0], create=False)
+
+    dataset = Dataset(default_union=True)
+    for filename in filenames:
+        if os.path.isdir(filename):
+            with open(os.path.join(filename, "manifest.json")) as f:
+                shards = [shard["file"] for shard in json.load(f)["shards"]]
+            for shard in shards:
+                parse(dataset, os.path.join(filename, shard))
+        else:
+            parse(dataset, filename)
+    return dataset
+
+
+def parse(dataset: Dataset, filename: str):
+    name = re.sub(r"\.(gz|zst)$", "", filename)
+    format = guess_format(name) or "turtle"
+    with open_text(filename, "r") as f:
+        dataset.parse(file=f, format=format)
+
+
+def negotiate(accept: str, formats: Dict[str, str]) -> str:
+    """Pick the first media type of an Accept header that is in ``formats``."""
+    for item in accept.split(","):
+        media_type = item.split(";")[0].strip()
+        if media_type in formats:
+            return media_type
+    return next(iter(formats))
+
+
+class SparqlEndpoint:
+    """Answer read-only SPARQL queries over a graph, caching the results.
+
+    The graph does not change while it is served, so a result stays valid
+    for as long as the endpoint runs. Queries are evaluated one at a time,
+    whichever thread they are answered on, as a SQLite graph store's
+    connection can only be used by one thread at a time.
+    """
+
+    def __init__(self, graph: Graph, cache_size: int = QUERY_CACHE_SIZE):
+        self.graph = graph
+        # Query results, by query text and Accept header, with their media type.
+        self.cache = InternCache(cache_size)
+        self.lock = threading.Lock()
+
+    def query(self, text: str, accept: str = "") -> Tuple[str, bytes, bool]:
+        """Return the media type and body of the results, and whether they were cached.
+
+        Raises ValueError for text that is not a SPARQL query, e.g. an update.
+        Errors evaluating a query are raised as they are, and not cached.
+        """
+        with self.lock:
+            # The media type depends on the query form, which is only known
+            # once parsed, so results are cached by the Accept header too.
+            (media_type, body), created = self.cache.get(
+                (text, accept), lambda: self.evaluate(text, accept)
+            )
+            return media_type, body, not created
+
+    def evaluate(self, text: str, accept: str) -> Tuple[str, bytes]:
+        try:
+            query = prepareQuery(text)
+        except Exception as e:
+            raise ValueError(f"Invalid query: {e}") from e
+        results = self.graph.query(query)
+        if results.type in ("SELECT", "ASK"):
+            media_type = negotiate(accept, RESULT_FORMATS)
+            return media_type, results.serialize(format=RESULT_FORMATS[media_type])
+        media_type = negotiate(accept, GRAPH_FORMATS)
+        return media_type, results.graph.serialize(
+            format=GRAPH_FORMATS[media_type], encoding="utf-8"
+        )
+
+
+class SparqlRequestHandler(BaseHTTPRequestHandler):
+    """Serve queries at /sparql by GET or POST, and the Ontodia viewer at /."""
+
+    endpoint: SparqlEndpoint
+    protocol_version = "HTTP/1.1"
+
+    def do_OPTIONS(self):
+        self.respond(204, "text/plain", b"")
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == "/":
+            self.viewer()
+        elif url.path == "/sparql":
+            self.answer(parse_qs(url.query).get("query", [None])[0])
+        else:
+            self.respond(404, "text/plain", b"Not found.")
+
+    def do_POST(self):
+        if urlsplit(self.path).path != "/sparql":
+            self.respond(404, "text/plain", b"Not found.")
+            return
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        content_type = self.headers.get("Content-Type", "").split(";")[0].strip()
+        if content_type == "application/sparql-query":
+            self.answer(body.decode("utf-8"))
+        else:
+            self.answer(parse_qs(body.decode("utf-8")).get("query", [None])[0])
+
+    def answer(self, query: Optional[str]):
+        if not query:
+            self.respond(400, "text/plain", b"Missing query.")
+            return
+        try:
+            media_type, body, cached = self.endpoint.query(
+                query, self.headers.get("Accept", "")
+            )
+        except ValueError as e:
+            self.respond(400, "text/plain", str(e).encode("utf-8"))
+            return
+        except Exception as e:
+            message = f"Query failed: {type(e).__name__}: {e}"
+            self.respond(500, "text/plain", message.encode("utf-8"))
+            return
+        self.respond(200, media_type, body, {"X-Cache": "hit" if cached else "miss"})
+
+    def viewer(self):
+        """The Ontodia viewer of the repository, querying this endpoint."""
+        with open(VIEWER, encoding="utf-8") as f:
+            page = re.sub(r'endpointUrl:\s*"[^"]*"', 'endpointUrl: "/sparql"', f.read())
+        self.respond(200, "text/html; charset=utf-8", page.encode("utf-8"))
+
+    def respond(
+        self,
+        status: int,
+        media_type: str,
+        body: bytes,
+        headers: Optional[Dict[str, str]] = None,
+    ):
+        self.send_response(status)
+        self.send_header("Content-Type", media_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("Access-Control-Allow-Methods", "GET, POST, OPTIONS")
+        self.send_header("Access-Control-Allow-Headers", "Accept, Content-Type")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def make_server(
+    endpoint: SparqlEndpoint, host: str = "localhost", port: int = 8000
+) -> ThreadingHTTPServer:
+    handler = type("Handler", (SparqlRequestHandler,), {"endpoint": endpoint})
+    return ThreadingHTTPServer((host, port), handler)
@@ -0,0 +1,99 @@
+"""Fast versions of the models in src/models.py for values the pipeline trusts.
+
+Each entity has the fields of its model, in ``__slots__``, and is built
+with only the checks that keep a bad row from being converted silently: as
+pydantic would, a missing value for a required field and a value that is
+not text for a text field raise a ValueError, and numbers given for fields
+that accept text are converted to text, so the triples are the same as
+those of the models. Nested entities, e.g. the RDFDataset of every entity
+of a record, are shared rather than copied as pydantic does, and are
+emitted once, then referenced by id.
+"""
+
+from typing import Dict, Tuple, Type, Union, get_args
+
+from pydantic import BaseModel
+
+from src import models
+
+
+class Entity:
+    __slots__ = ()
+    # (name, alias) of each field, in the order of the model.
+    fields: Tuple[Tuple[str, str], ...] = ()
+    defaults: Dict[str, object] = {}
+    # Fields that accept text, which numbers are converted to.
+    text_fields: frozenset = frozenset()
+    # Fields that only accept text.
+    str_fields: frozenset = frozenset()
+    required: frozenset = frozenset()
+
+    def __init__(self, **values):
+        defaults = self.defaults
+        text_fields = self.text_fields
+        for name, _ in self.fields:
+            value = values.get(name, defaults.get(name))
+            if value is None:
+                if name in self.required:
+                    raise ValueError(f"{type(self).__name__}.{name} is required.")
+            elif name in text_fields and isinstance(value, (int, float)):
+                value = str(value)
+            elif name in self.str_fields and not isinstance(value, str):
+                raise ValueError(
+                    f"{type(self).__name__}.{name} must be text, not {value!r}."
+                )
+            setattr(self, name, value)
+
+    def __repr__(self):
+        return f"{type(self).__name__}(id={self.id!r})"
+
+
+# A validated model or a fast entity.
+Model = Union[BaseModel, Entity]
+
+
+def accepts_text(field) -> bool:
+    return field.outer_type_ is str or str in get_args(field.outer_type_)
+
+
+def entity_class(model: Type[BaseModel]) -> Type[Entity]:
+    """Make the fast entity class of a pydantic model class."""
+    fields = tuple(model.__fields__.values())
+    return type(
+        model.__name__,
+        (Entity,),
+        {
+            "__slots__": tuple(field.name for field in fields),
+            "__module__": __name__,
+            "__doc__": f"Fast version of src.models.{model.__name__}.",
+            "fields": tuple((field.name, field.alias) for field in fields),
+            "defaults": {
+                field.name: field.default
+                for field in fields
+                if field.default is not None
+            },
+            "text_fields": frozenset(
+                field.name for field in fields if accepts_text(field)
+            ),
+            "str_fields": frozenset(
+                field.name for field in fields if field.outer_type_ is str
+            ),
+            "required": frozenset(field.name for field in fields if field.required),
+        },
+    )
+
+
+Attribute = entity_class(models.Attribute)
+Geometry = entity_class(models.Geometry)
+MaterialSample = entity_class(models.MaterialSample)
+Observation = entity_class(models.Observation)
+Person = entity_class(models.Person)
+Procedure = entity_class(models.Procedure)
+RDFDataset = entity_class(models.RDFDataset)
+Sample = entity_class(models.Sample)
+Sampling = entity_class(models.Sampling)
+Site = entity_class(models.Site)
+SiteVisit = entity_class(models.SiteVisit)
+Taxon = entity_class(models.Taxon)
+Text = entity_class(models.Text)
+TimeInstant = entity_class(models.TimeInstant)
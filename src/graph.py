@@ -1,10 +1,22 @@
+from typing import Optional
+
 from rdflib import Graph, DCTERMS, SOSA, PROV, SDO, VOID, TIME
 
 from src.namespaces import EX, TERN, TERN_LOC, GEO, WGS, DWC, SF
 
 
-def create_graph():
-    g = Graph()
+def create_graph(filename: Optional[str] = None):
+    """Create a graph with the prefixes of the output bound.
+
+    With a ``filename``, the graph is kept in that SQLite database instead
+    of in memory (see src.store).
+    """
+    if filename is None:
+        g = Graph()
+    else:
+        from src.store import open_sqlite_graph
+
+        g = open_sqlite_graph(filename)
     g.bind("ex", EX)
     g.bind("tern", TERN)
     g.bind("tern-loc", TERN_LOC)
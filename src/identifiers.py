@@ -0,0 +1,27 @@
+from uuid import UUID, uuid5
+
+from rdflib import Namespace, URIRef
+
+from src.namespaces import EX
+
+# Namespace for the name-based UUIDs of the entities minted for each record.
+NAMESPACE_RECORD = uuid5(UUID("6ba7b811-9dad-11d1-80b4-00c04fd430c8"), str(EX))
+
+
+def mint_uuid(record_id: str, role: str) -> str:
+    """Derive a stable UUID (v5) from a record's recordID and the entity's role in it."""
+    return str(uuid5(NAMESPACE_RECORD, f"{record_id}/{role}"))
+
+
+def mint_iri(record_id: str, role: str, namespace: Namespace = EX) -> URIRef:
+    return namespace[mint_uuid(record_id, role)]
+
+
+def mint_bnode(record_id: str, role: str) -> str:
+    """Return the "@id" of a blank node with a stable label."""
+    return "_:" + mint_uuid(record_id, role).replace("-", "")
+
+
+def mint_shared_bnode(role: str, key: str) -> str:
+    """Return the "@id" of a blank node shared across records, e.g. a person by name."""
+    return "_:" + str(uuid5(NAMESPACE_RECORD, f"{role}:{key}")).replace("-", "")
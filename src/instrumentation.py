@@ -0,0 +1,140 @@
+import json
+import resource
+import sys
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from time import perf_counter
+from typing import Iterable, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process and its finished children in MiB."""
+    rss = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    # ru_maxrss is in bytes on macOS and in KiB elsewhere.
+    return rss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+class Instrumentation:
+    """Collect stage and per-entity-type timings of a conversion run."""
+
+    def __init__(self, progress_every: int = 0):
+        self.progress_every = progress_every
+        self.start = perf_counter()
+        self.stages = defaultdict(float)
+        self.entity_counts = defaultdict(int)
+        self.entity_seconds = defaultdict(float)
+        self.rows = 0
+        self.triples = 0
+        self.pipeline: Optional[dict] = None
+
+    @contextmanager
+    def stage(self, name: str):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] += perf_counter() - start
+
+    def timed(self, name: str, iterable: Iterable[T]) -> Iterator[T]:
+        """Yield from ``iterable``, adding the time spent producing each item to a stage."""
+        iterator = iter(iterable)
+        while True:
+            start = perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.stages[name] += perf_counter() - start
+                return
+            self.stages[name] += perf_counter() - start
+            yield item
+
+    def entity(self, name: str, seconds: float):
+        self.entity_counts[name] += 1
+        self.entity_seconds[name] += seconds
+
+    def record(self, n_triples: int):
+        self.rows += 1
+        self.triples += n_triples
+        if self.progress_every and self.rows % self.progress_every == 0:
+            print(self.progress(), file=sys.stderr, flush=True)
+
+    def progress(self) -> str:
+        elapsed = perf_counter() - self.start
+        return (
+            f"{self.rows} rows, {self.triples} triples in {elapsed:.1f}s "
+            f"({self.rows / elapsed:.0f} rows/s, {self.triples / elapsed:.0f} triples/s), "
+            f"peak RSS {peak_rss_mb():.0f} MiB"
+        )
+
+    def report(self, graph_size: Optional[int] = None) -> dict:
+        elapsed = perf_counter() - self.start
+        return {
+            "seconds": elapsed,
+            "rows": self.rows,
+            "triples": self.triples,
+            "graph_size": graph_size,
+            "rows_per_second": self.rows / elapsed if elapsed else None,
+            "triples_per_second": self.triples / elapsed if elapsed else None,
+            "peak_rss_mb": peak_rss_mb(),
+            "stages": dict(self.stages),
+            "pipeline": self.pipeline,
+            "entities": {
+                name: {
+                    "count": count,
+                    "seconds": self.entity_seconds[name],
+                }
+                for name, count in self.entity_counts.items()
+            },
+        }
+
+    def write_report(self, filename: str, graph_size: Optional[int] = None):
+        with open(filename, "w") as f:
+            json.dump(self.report(graph_size), f, indent=2)
+
+
+# The instrumentation of the current run, if it is enabled.
+active: Optional[Instrumentation] = None
+
+
+def enable(progress_every: int = 0) -> Instrumentation:
+    global active
+    active = Instrumentation(progress_every)
+    return active
+
+
+def stage(name: str):
+    """Time a block as a stage of the active instrumentation, if any."""
+    if active is None:
+        return nullcontext()
+    return active.stage(name)
+
+
+def timed(name: str, iterable: Iterable[T]) -> Iterable[T]:
+    """Time the production of each item as a stage of the active instrumentation, if any."""
+    if active is None:
+        return iterable
+    return active.timed(name, iterable)
+
+
+def record(n_triples: int):
+    """Count a converted record in the active instrumentation, if any."""
+    if active is not None:
+        active.record(n_triples)
+
+
+def records(n_records: int, n_triples: int):
+    """Count records converted by a worker process in the active instrumentation, if any."""
+    if active is not None:
+        active.rows += n_records
+        active.triples += n_triples
+
+
+def pipeline(report: dict):
+    """Keep the utilization of the stages of a pipeline in the active instrumentation, if any."""
+    if active is not None:
+        active.pipeline = report
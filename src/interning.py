@@ -0,0 +1,40 @@
+from collections import OrderedDict
+from typing import Callable, Hashable, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class InternCache:
+    """A size-bounded map of interned entities that evicts the least recently used.
+
+    Entities that repeat across records, such as persons, taxa and vocabulary
+    terms, are built once and reused while they stay in the cache. The
+    SPARQL endpoint keeps its query results in one too.
+    """
+
+    def __init__(self, maxsize: int = 100_000):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, factory: Callable[[], T]) -> Tuple[T, bool]:
+        """Return the entity for ``key`` and whether it was just built by ``factory``."""
+        try:
+            entity = self.entries[key]
+        except KeyError:
+            self.misses += 1
+            entity = self.entries[key] = factory()
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+            return entity, True
+
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entity, False
+
+    def __len__(self):
+        return len(self.entries)
+
+    def clear(self):
+        self.entries.clear()
@@ -0,0 +1,355 @@
+import csv
+import string
+from time import perf_counter
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+
+import pandas as pd
+from rdflib import DCTERMS, PROV, RDF, RDFS, SDO, SOSA, TIME, VOID, XSD
+from rdflib import Literal, URIRef
+from rdflib.term import Node
+
+from src import create_uriref, instrumentation
+from src.emitter import Triple, to_node
+from src.identifiers import mint_bnode, mint_shared_bnode, mint_uuid
+from src.interning import InternCache
+from src.namespaces import BDR_CV, DWC, EX, GEO, SF, TERN, TERN_LOC, WGS
+
+# Prefixes that can be used in the terms of a mapping table.
+PREFIXES = {
+    "ex": EX,
+    "tern": TERN,
+    "tern-loc": TERN_LOC,
+    "geo": GEO,
+    "wgs": WGS,
+    "bdr-cv": BDR_CV,
+    "dwc": DWC,
+    "sf": SF,
+    "dcterms": DCTERMS,
+    "sosa": SOSA,
+    "prov": PROV,
+    "sdo": SDO,
+    "void": VOID,
+    "time": TIME,
+    "rdf": RDF,
+    "rdfs": RDFS,
+    "xsd": XSD,
+}
+
+ID_KINDS = {"uuid", "bnode", "iri", "column"}
+VALUE_KINDS = {"iri", "literal", "column", "template", "entity", "identifier"}
+
+# Computes the object of a triple from the row, the ids of the record's
+# entities and the literals already made for the row, or None to leave the
+# triple out.
+Getter = Callable[[dict, Dict[str, Optional[Node]], dict], Optional[Node]]
+# A predicate with either a constant object or a getter of the object.
+Property = Tuple[URIRef, Optional[Node], Optional[Getter]]
+
+
+def expand(term: str) -> str:
+    """Expand a CURIE with one of the PREFIXES, leaving full IRIs as they are."""
+    prefix, _, local = term.partition(":")
+    if prefix in PREFIXES:
+        return PREFIXES[prefix] + local
+    return term
+
+
+class MappingError(ValueError):
+    pass
+
+
+class MappingRow(NamedTuple):
+    line: int
+    entity: str
+    predicate: str
+    kind: str
+    value: str
+    datatype: str
+    when: str
+
+
+class Entity:
+    """The compiled plan of one entity of a record."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.id_kind: Optional[str] = None
+        self.id_value: Optional[Union[str, Node]] = None
+        # Column that must have a value for the entity to be emitted.
+        self.when: Optional[str] = None
+        # Group and key column the entity is interned by.
+        self.shared: Optional[Tuple[str, str]] = None
+        # Column of the recordID the entity's id is minted from, if not the record's.
+        self.scope: Optional[str] = None
+        self.properties: List[Property] = []
+        # Properties emitted for every record an interned entity is part of.
+        self.links: List[Property] = []
+
+
+class Mapping:
+    """A mapping table compiled into a plan that converts a row to triples.
+
+    The table has one row per entity and predicate, with the columns:
+
+    - ``entity``: name of the entity, which is also its role when minting ids.
+    - ``predicate``: a CURIE or IRI, ``@id`` for the id of the entity,
+      ``@shared`` for the key the entity is interned by or ``@scope`` for a
+      column of the recordID to mint the id from instead of the record's.
+    - ``kind`` and ``value``: how the object is made from ``value``. Ids are
+      a ``uuid`` in the namespace ``value`` or a ``bnode``, both derived from
+      the recordID and the entity name, a constant ``iri`` or the ``column``
+      ``value``. Objects are a constant ``iri`` or ``literal``, the value of
+      the ``column`` ``value``, a ``template`` IRI with ``{column}``
+      placeholders, a reference to the ``entity`` ``value`` or the
+      ``identifier`` of that entity as a literal. For ``@shared``, ``kind``
+      is the group the entity is interned in and ``value`` the key column.
+      For ``@scope``, ``value`` is the column, e.g. ``_site``; an entity
+      scoped to another record only gets its void:inDataset triples.
+    - ``datatype``: the datatype of a literal, or ``@id`` to make a column
+      value a node.
+    - ``when``: on the ``@id`` row, a column that must have a value for the
+      entity to be emitted.
+
+    Missing values leave the triple out, except for the recordID, the
+    columns ``column`` ids are made from, e.g. the taxon's, and ``@shared``
+    keys, e.g. a person's name, which raise a MappingError, as the entities
+    of src/entities.py do, so the row is quarantined rather than converted
+    in part. Predicates, datatypes and
+    constant objects are converted to rdflib terms once, when the table is
+    compiled.
+    """
+
+    def __init__(self, rows: List[MappingRow], record_id_column: str = "recordID"):
+        self.record_id_column = record_id_column
+        self.rows = rows
+        self.entities: Dict[str, Entity] = {}
+        for row in rows:
+            self.add(row)
+
+        for entity in self.entities.values():
+            if entity.id_kind is None:
+                raise MappingError(f"Entity {entity.name!r} has no @id.")
+        self.plan = list(self.entities.values())
+
+    @property
+    def columns(self) -> List[str]:
+        """The columns of the input read by the mapping, without derived (``_``) ones."""
+        columns = [self.record_id_column]
+        for row in self.rows:
+            if row.predicate == "@shared" or row.kind == "column":
+                columns.append(row.value)
+            elif row.kind == "template":
+                columns.extend(template_columns(row.value))
+            if row.when:
+                columns.append(row.when)
+        return [
+            column for column in dict.fromkeys(columns) if not column.startswith("_")
+        ]
+
+    def add(self, row: MappingRow):
+        entity = self.entities.get(row.entity)
+        if entity is None:
+            entity = self.entities[row.entity] = Entity(row.entity)
+
+        if row.predicate == "@id":
+            if row.kind not in ID_KINDS:
+                raise MappingError(f"Line {row.line}: unknown @id kind {row.kind!r}.")
+            entity.id_kind = row.kind
+            if row.kind == "iri":
+                entity.id_value = URIRef(expand(row.value))
+            elif row.kind == "uuid":
+                entity.id_value = expand(row.value)
+            else:
+                entity.id_value = row.value
+            entity.when = row.when or None
+        elif row.predicate == "@shared":
+            entity.shared = (row.kind, row.value)
+        elif row.predicate == "@scope":
+            entity.scope = row.value
+        else:
+            if row.kind not in VALUE_KINDS:
+                raise MappingError(f"Line {row.line}: unknown kind {row.kind!r}.")
+            predicate = URIRef(expand(row.predicate))
+            property_ = compile_property(predicate, row)
+            entity.properties.append(property_)
+            if predicate == VOID.inDataset:
+                entity.links.append(property_)
+
+    @staticmethod
+    def interned(entity: Entity, row: dict, cache) -> bool:
+        """Whether an entity is interned by its key for this row.
+
+        Entities without a key value are never interned, or every one of
+        them would be the same entity.
+        """
+        return (
+            entity.shared is not None
+            and cache is not None
+            and row.get(entity.shared[1]) is not None
+        )
+
+    def entity_id(self, entity: Entity, row: dict, record_id: str, cache):
+        if entity.when is not None and not row[entity.when]:
+            return None
+        if entity.shared is not None and row.get(entity.shared[1]) is None:
+            raise MappingError(
+                f"Entity {entity.name!r} has no key: {entity.shared[1]} is missing."
+            )
+        kind = entity.id_kind
+        if self.interned(entity, row, cache) and kind == "bnode":
+            group, key = entity.shared
+            return to_node(mint_shared_bnode(group, str(row[key])))
+        if entity.scope is not None:
+            record_id = row.get(entity.scope) or record_id
+        if kind == "uuid":
+            return URIRef(entity.id_value + mint_uuid(record_id, entity.name))
+        if kind == "bnode":
+            return to_node(mint_bnode(record_id, entity.name))
+        if kind == "iri":
+            return entity.id_value
+        value = row[entity.id_value]
+        if value is None:
+            raise MappingError(
+                f"Entity {entity.name!r} has no id: {entity.id_value} is missing."
+            )
+        return to_node(str(value))
+
+    def convert(
+        self, row: Union[pd.Series, dict], cache: Optional[InternCache] = None
+    ) -> List[Triple]:
+        """Convert one row to triples by running the compiled plan.
+
+        With a ``cache``, ``@shared`` entities are interned: their triples
+        are emitted for the first record only, and their void:inDataset
+        triples for every record.
+        """
+        if isinstance(row, pd.Series):
+            row = row.to_dict()
+        record_id = row[self.record_id_column]
+        if record_id is None:
+            raise MappingError(f"{self.record_id_column} is missing.")
+
+        ids = {
+            entity.name: self.entity_id(entity, row, record_id, cache)
+            for entity in self.plan
+        }
+
+        triples = []
+        emitted = set()
+        literals = {}
+        for entity in self.plan:
+            subject = ids[entity.name]
+            if subject is None or subject in emitted:
+                continue
+            emitted.add(subject)
+
+            properties = entity.properties
+            if self.interned(entity, row, cache):
+                group, key = entity.shared
+                _, created = cache.get((group, row[key]), lambda: subject)
+                if not created:
+                    properties = entity.links
+            elif entity.scope is not None:
+                if row.get(entity.scope) not in (None, record_id):
+                    properties = entity.links
+
+            if instrumentation.active is None:
+                self.emit(subject, properties, row, ids, literals, triples)
+            else:
+                start = perf_counter()
+                self.emit(subject, properties, row, ids, literals, triples)
+                instrumentation.active.entity(entity.name, perf_counter() - start)
+        return triples
+
+    @staticmethod
+    def emit(subject, properties, row, ids, literals, triples: List[Triple]):
+        for predicate, obj, getter in properties:
+            if getter is not None:
+                obj = getter(row, ids, literals)
+            if obj is not None:
+                triples.append((subject, predicate, obj))
+
+
+def template_columns(template: str) -> List[str]:
+    return [field for _, field, _, _ in string.Formatter().parse(template) if field]
+
+
+def compile_property(predicate: URIRef, row: MappingRow) -> Property:
+    """Convert the object of a mapping row to a constant node or a getter."""
+    kind, value = row.kind, row.value
+    datatype = URIRef(expand(row.datatype)) if row.datatype not in ("", "@id") else None
+
+    if kind == "iri":
+        return predicate, URIRef(expand(value)), None
+    if kind == "literal":
+        return predicate, Literal(value, datatype=datatype), None
+
+    if kind == "column":
+        if row.datatype == "@id":
+
+            def getter(row, ids, literals):
+                cell = row[value]
+                return None if cell is None else to_node(str(cell))
+
+        else:
+
+            # Columns are often used by several entities of a record, e.g.
+            # the result time, so each literal is only made once per row.
+            def getter(row, ids, literals):
+                literal = literals.get((value, datatype))
+                if literal is None:
+                    cell = row[value]
+                    if cell is None:
+                        return None
+                    literal = literals[value, datatype] = Literal(
+                        str(cell), datatype=datatype
+                    )
+                return literal
+
+    elif kind == "template":
+        template = expand(value)
+        columns = template_columns(template)
+
+        def getter(row, ids, literals):
+            cells = {column: row[column] for column in columns}
+            if any(cell is None for cell in cells.values()):
+                return None
+            return URIRef(
+                template.format(
+                    **{
+                        column: create_uriref(str(cell))
+                        for column, cell in cells.items()
+                    }
+                )
+            )
+
+    elif kind == "entity":
+
+        def getter(row, ids, literals):
+            return ids.get(value)
+
+    else:
+
+        def getter(row, ids, literals):
+            node = ids.get(value)
+            return None if node is None else Literal(str(node), datatype=datatype)
+
+    return predicate, None, getter
+
+
+def load_mapping(filename: str, record_id_column: str = "recordID") -> Mapping:
+    """Compile a mapping table (see Mapping) from a CSV file."""
+    with open(filename, newline="", encoding="utf-8") as f:
+        rows = [
+            MappingRow(
+                line,
+                row["entity"],
+                row["predicate"],
+                row["kind"],
+                row["value"],
+                row.get("datatype") or "",
+                row.get("when") or "",
+            )
+            for line, row in enumerate(csv.DictReader(f), start=2)
+        ]
+    return Mapping(rows, record_id_column)
@@ -0,0 +1,148 @@
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import List, Optional, Tuple
+
+from rdflib import URIRef
+
+from src import instrumentation
+from src.convert import convert_row
+from src.interning import InternCache
+from src.mapping import load_mapping
+from src.readers import count_rows, mapped_columns
+from src.serializer import open_text
+from src.sites import SiteIndex
+from src.streaming import (
+    FORMATS,
+    RECORDS_PER_SHARD,
+    iter_rows,
+    merge_record_graphs,
+    open_writer,
+)
+
+
+def partition(n_rows: int, n_partitions: int) -> List[Tuple[int, int]]:
+    """Split ``n_rows`` rows into contiguous ranges of near equal size."""
+    size, remainder = divmod(n_rows, n_partitions)
+    ranges = []
+    start = 0
+    for i in range(n_partitions):
+        stop = start + size + (1 if i < remainder else 0)
+        if stop > start:
+            ranges.append((start, stop))
+        start = stop
+    return ranges
+
+
+def shard_filename(output_filename: str, index: int) -> str:
+    base, ext = os.path.splitext(output_filename)
+    return f"{base}.part-{index:05d}{ext}"
+
+
+def convert_partition(
+    filename: str,
+    start: int,
+    stop: int,
+    shard: str,
+    format: str,
+    graph: Optional[URIRef],
+    chunksize: int,
+    intern_cache_size: int = 0,
+    mapping_filename: Optional[str] = None,
+    records_per_shard: int = RECORDS_PER_SHARD,
+    site_radius: Optional[float] = None,
+    strict: bool = False,
+) -> Tuple[int, int]:
+    """Convert the rows from ``start`` up to ``stop`` into one output shard.
+
+    With a ``site_radius``, records are merged into sites within the shard.
+    Returns the number of records and triples converted.
+    """
+    cache = InternCache(intern_cache_size) if intern_cache_size else None
+    sites = SiteIndex(site_radius) if site_radius else None
+    if mapping_filename:
+        mapping = load_mapping(mapping_filename)
+        convert, columns = mapping.convert, mapped_columns(mapping)
+    else:
+        convert, columns = partial(convert_row, strict=strict), None
+    n_records = n_triples = 0
+    with open_writer(shard, format, graph, records_per_shard) as writer:
+        for _, row in iter_rows(filename, chunksize, start, stop, columns, sites):
+            triples = convert(row, cache)
+            writer.write(triples)
+            n_records += 1
+            n_triples += len(triples)
+    return n_records, n_triples
+
+
+def merge_shards(shards: List[str], output_filename: str, format: str):
+    """Concatenate the shards in order, keeping only the first Turtle prefix block."""
+    with open_text(output_filename) as output:
+        for i, shard in enumerate(shards):
+            with open_text(shard, "r") as f:
+                if format == "turtle" and i > 0:
+                    for line in f:
+                        if not line.startswith("@prefix"):
+                            output.write(line)
+                            break
+                shutil.copyfileobj(f, output)
+            os.remove(shard)
+
+
+def parallel_convert(
+    filename: str,
+    output_filename: str,
+    format: str,
+    workers: int,
+    graph: Optional[URIRef] = None,
+    merge: bool = True,
+    chunksize: int = 10_000,
+    intern_cache_size: int = 0,
+    mapping_filename: Optional[str] = None,
+    records_per_shard: int = RECORDS_PER_SHARD,
+    site_radius: Optional[float] = None,
+    strict: bool = False,
+) -> List[str]:
+    """Convert row ranges of the CSV file in a process pool, one shard per range.
+
+    The shards are merged into ``output_filename`` unless ``merge`` is false,
+    in which case they are left in place. Returns the files written. The
+    records and triples of the workers are counted in the active
+    instrumentation, if any.
+    """
+    if format not in FORMATS:
+        raise ValueError(f"Unsupported streaming format {format!r}.")
+
+    ranges = partition(count_rows(filename), workers)
+    shards = [shard_filename(output_filename, i) for i in range(len(ranges))]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(
+                convert_partition,
+                filename,
+                start,
+                stop,
+                shard,
+                format,
+                graph,
+                chunksize,
+                intern_cache_size,
+                mapping_filename,
+                records_per_shard,
+                site_radius,
+                strict,
+            )
+            for (start, stop), shard in zip(ranges, shards)
+        ]
+        for future in futures:
+            instrumentation.records(*future.result())
+
+    if not merge:
+        return shards
+    if format == "record-graphs":
+        merge_record_graphs(shards, output_filename)
+    else:
+        merge_shards(shards, output_filename, format)
+    return [output_filename]
@@ -0,0 +1,184 @@
+import queue
+import threading
+from time import perf_counter
+from typing import Callable, Iterable, List, Optional, Tuple
+
+# Batches that may wait between two stages before the earlier one blocks.
+PIPELINE_QUEUE_SIZE = 8
+
+# Items passed from one stage to the next at a time.
+PIPELINE_BATCH_SIZE = 500
+
+# Seconds a blocked stage waits before checking whether another has failed.
+POLL_INTERVAL = 0.1
+
+# Put on a queue after the last batch.
+END = object()
+
+
+class Stopped(Exception):
+    """Raised in a stage when another stage has failed."""
+
+
+class StageTimes:
+    """Time a stage of a pipeline spends working and blocked on its queues."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.busy = 0.0
+        self.waiting_for_input = 0.0
+        self.waiting_for_output = 0.0
+
+    def report(self, seconds: float) -> dict:
+        return {
+            "items": self.items,
+            "busy_seconds": self.busy,
+            "utilization": self.busy / seconds if seconds else None,
+            "waiting_for_input_seconds": self.waiting_for_input,
+            "waiting_for_output_seconds": self.waiting_for_output,
+        }
+
+
+class Pipeline:
+    """Run the stages of a conversion in threads connected by bounded queues.
+
+    The first stage reads the items of ``source``, and each of ``stages``,
+    given as a name and a function, maps a batch of items from the stage
+    before it to a batch for the next, in order. The batches returned by the
+    last stage are dropped. A stage blocks when the queue to the next is
+    full, so memory stays bounded by ``queue_size`` batches per queue, and
+    the slowest stage sets the pace of the others. Stages only overlap while
+    one of them waits on I/O or runs code that releases the GIL, e.g. pandas
+    parsing or compression, so the utilization of each shows which one is
+    the bottleneck.
+
+    An error in any stage stops the others and is raised by ``run``.
+    """
+
+    def __init__(
+        self,
+        source: Iterable,
+        stages: List[Tuple[str, Callable[[list], list]]],
+        source_name: str = "read",
+        queue_size: int = PIPELINE_QUEUE_SIZE,
+        batch_size: int = PIPELINE_BATCH_SIZE,
+    ):
+        self.source = source
+        self.stages = stages
+        self.batch_size = batch_size
+        self.queues = [queue.Queue(queue_size) for _ in stages]
+        self.times = [StageTimes(source_name)] + [
+            StageTimes(name) for name, _ in stages
+        ]
+        self.failed = threading.Event()
+        self.errors: List[BaseException] = []
+        self.seconds = 0.0
+
+    def get(self, q: queue.Queue, times: StageTimes):
+        start = perf_counter()
+        try:
+            while True:
+                if self.failed.is_set():
+                    raise Stopped()
+                try:
+                    return q.get(timeout=POLL_INTERVAL)
+                except queue.Empty:
+                    pass
+        finally:
+            times.waiting_for_input += perf_counter() - start
+
+    def put(self, q: Optional[queue.Queue], batch, times: StageTimes):
+        if q is None:
+            return
+        start = perf_counter()
+        try:
+            while True:
+                if self.failed.is_set():
+                    raise Stopped()
+                try:
+                    q.put(batch, timeout=POLL_INTERVAL)
+                    return
+                except queue.Full:
+                    pass
+        finally:
+            times.waiting_for_output += perf_counter() - start
+
+    def read(self):
+        times = self.times[0]
+        output = self.queues[0]
+        iterator = iter(self.source)
+        while True:
+            start = perf_counter()
+            batch = []
+            for item in iterator:
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+            times.busy += perf_counter() - start
+            times.items += len(batch)
+            if batch:
+                self.put(output, batch, times)
+            if len(batch) < self.batch_size:
+                self.put(output, END, times)
+                return
+
+    def process(self, index: int):
+        _, function = self.stages[index]
+        times = self.times[index + 1]
+        input = self.queues[index]
+        output = self.queues[index + 1] if index + 1 < len(self.queues) else None
+        while True:
+            batch = self.get(input, times)
+            if batch is END:
+                self.put(output, END, times)
+                return
+            start = perf_counter()
+            result = function(batch)
+            times.busy += perf_counter() - start
+            times.items += len(batch)
+            self.put(output, result, times)
+
+    def guard(self, target: Callable, *args):
+        try:
+            target(*args)
+        except Stopped:
+            pass
+        except BaseException as e:
+            self.errors.append(e)
+            self.failed.set()
+
+    def run(self):
+        """Run the pipeline until every item has passed through the last stage."""
+        start = perf_counter()
+        threads = [
+            threading.Thread(target=self.guard, args=(self.read,), name="read")
+        ] + [
+            threading.Thread(target=self.guard, args=(self.process, i), name=name)
+            for i, (name, _) in enumerate(self.stages)
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                thread.join()
+        except BaseException:
+            self.failed.set()
+            for thread in threads:
+                thread.join()
+            raise
+        finally:
+            self.seconds = perf_counter() - start
+        if self.errors:
+            raise self.errors[0]
+
+    def report(self) -> dict:
+        """The time each stage spent working and waiting, and its utilization."""
+        return {times.name: times.report(self.seconds) for times in self.times}
+
+    def summary(self) -> str:
+        return ", ".join(
+            f"{times.name} {times.busy / self.seconds:.0%} busy"
+            for times in self.times
+            if self.seconds
+        )
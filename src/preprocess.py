@@ -0,0 +1,63 @@
+import pandas as pd
+
+# Columns of the ALA download read by preprocess.
+COLUMNS = [
+    "eventDate",
+    "verbatimEventDate",
+    "dateIdentified",
+    "verbatimElevation",
+    "decimalLatitude",
+    "decimalLongitude",
+]
+
+
+def to_none(data):
+    """Cast a Series or DataFrame to object dtype with missing values as None."""
+    data = data.astype(object)
+    return data.where(data.notna(), None)
+
+
+def preprocess(df: pd.DataFrame) -> pd.DataFrame:
+    """Derive the cleaned columns used by convert_row for a chunk of records.
+
+    Missing values become None in every column, so rows can be read without
+    checking for NaN. The derived columns are prefixed with an underscore:
+
+    - ``_result_time``: eventDate, or the ISO datetime of verbatimEventDate (d/m/Y)
+    - ``_date_identified``: ISO datetime of the first day of the dateIdentified year
+    - ``_elevation``: verbatimElevation without spaces and units
+    - ``_wkt``: WKT point of decimalLongitude and decimalLatitude
+    """
+    verbatim_event_date = pd.to_datetime(
+        df["verbatimEventDate"], format="%d/%m/%Y", errors="coerce"
+    ).dt.strftime("%Y-%m-%dT%H:%M:%S")
+    result_time = df["eventDate"].where(df["eventDate"].notna(), verbatim_event_date)
+
+    year = pd.to_numeric(df["dateIdentified"], errors="coerce").astype("Int64")
+    date_identified = year.astype(str) + "-01-01T00:00:00"
+
+    elevation = (
+        df["verbatimElevation"]
+        .astype(str)
+        .str.replace(" ", "", regex=False)
+        .str.replace("m", "", regex=False)
+    )
+
+    wkt = (
+        "POINT("
+        + to_none(df["decimalLongitude"]).map(str)
+        + " "
+        + to_none(df["decimalLatitude"]).map(str)
+        + ")"
+    )
+
+    derived = pd.DataFrame(
+        {
+            "_result_time": to_none(result_time),
+            "_date_identified": to_none(date_identified.where(year.notna())),
+            "_elevation": to_none(elevation.where(df["verbatimElevation"].notna())),
+            "_wkt": wkt.astype(object),
+        },
+        index=df.index,
+    )
+    return pd.concat([to_none(df), derived], axis=1)
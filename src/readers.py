@@ -0,0 +1,133 @@
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+import pandas as pd
+
+from src import convert, preprocess
+
+PARQUET_SUFFIXES = {".parquet", ".pq"}
+ARROW_SUFFIXES = {".arrow", ".feather", ".ipc"}
+
+
+def mapped_columns(mapping=None) -> List[str]:
+    """The columns of the ALA download read by the models or a compiled ``mapping``."""
+    columns = convert.COLUMNS if mapping is None else mapping.columns
+    return list(dict.fromkeys(columns + preprocess.COLUMNS))
+
+
+def input_format(filename: str) -> str:
+    suffix = Path(filename).suffix.lower()
+    if suffix in PARQUET_SUFFIXES:
+        return "parquet"
+    if suffix in ARROW_SUFFIXES:
+        return "arrow"
+    return "csv"
+
+
+def import_pyarrow():
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise ImportError("Reading Parquet or Arrow files requires pyarrow.") from e
+    return pyarrow
+
+
+def count_rows(filename: str, chunksize: int = 100_000) -> int:
+    format = input_format(filename)
+    if format == "parquet":
+        import_pyarrow()
+        import pyarrow.parquet as pq
+
+        return pq.ParquetFile(filename).metadata.num_rows
+    if format == "arrow":
+        import_pyarrow()
+        import pyarrow.feather as feather
+
+        return feather.read_table(filename, columns=[], memory_map=True).num_rows
+
+    with pd.read_csv(filename, usecols=[0], chunksize=chunksize) as reader:
+        return sum(len(chunk) for chunk in reader)
+
+
+def read_chunks(
+    filename: str,
+    columns: Optional[List[str]] = None,
+    chunksize: int = 10_000,
+    start: int = 0,
+    stop: Optional[int] = None,
+) -> Iterator[pd.DataFrame]:
+    """Read the rows from ``start`` up to ``stop`` in DataFrames of ``chunksize`` rows.
+
+    Only ``columns`` are parsed, or all columns if it is None. CSV files
+    (optionally compressed), Parquet files and Arrow IPC (Feather) files
+    are supported. Chunks are indexed by row number in the file.
+    """
+    format = input_format(filename)
+    if format == "parquet":
+        chunks = read_parquet_chunks(filename, columns, chunksize, start, stop)
+    elif format == "arrow":
+        chunks = read_arrow_chunks(filename, columns, chunksize, start, stop)
+    else:
+        chunks = read_csv_chunks(filename, columns, chunksize, start, stop)
+
+    for chunk in chunks:
+        chunk.index = pd.RangeIndex(start, start + len(chunk))
+        start += len(chunk)
+        yield chunk
+
+
+def read_csv_chunks(filename, columns, chunksize, start, stop):
+    with pd.read_csv(
+        filename,
+        usecols=columns,
+        chunksize=chunksize,
+        skiprows=(lambda i: 0 < i <= start) if start else None,
+        nrows=None if stop is None else stop - start,
+    ) as reader:
+        yield from reader
+
+
+def read_parquet_chunks(filename, columns, chunksize, start, stop):
+    import_pyarrow()
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(filename)
+    metadata = parquet_file.metadata
+    if stop is None:
+        stop = metadata.num_rows
+
+    # Only read the row groups that overlap the requested rows.
+    row_groups = []
+    offset = first_row = 0
+    for i in range(metadata.num_row_groups):
+        n_rows = metadata.row_group(i).num_rows
+        if offset + n_rows > start and offset < stop:
+            if not row_groups:
+                first_row = offset
+            row_groups.append(i)
+        offset += n_rows
+    if not row_groups:
+        return
+
+    position = first_row
+    for batch in parquet_file.iter_batches(
+        batch_size=chunksize, row_groups=row_groups, columns=columns
+    ):
+        batch_start = position
+        position += batch.num_rows
+        low, high = max(start, batch_start), min(stop, position)
+        if high > low:
+            yield batch.slice(low - batch_start, high - low).to_pandas()
+        if position >= stop:
+            return
+
+
+def read_arrow_chunks(filename, columns, chunksize, start, stop):
+    import_pyarrow()
+    import pyarrow.feather as feather
+
+    table = feather.read_table(filename, columns=columns, memory_map=True)
+    if stop is None:
+        stop = table.num_rows
+    for batch in table.slice(start, stop - start).to_batches(chunksize):
+        yield batch.to_pandas()
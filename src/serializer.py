@@ -0,0 +1,177 @@
+import gzip
+import io
+import re
+from typing import Dict, Iterable, List, Optional, Set, TextIO
+
+from rdflib import RDF, BNode, Graph, Literal, URIRef
+from rdflib.plugins.parsers.ntriples import NTGraphSink, W3CNTriplesParser
+from rdflib.term import Node
+
+from src.emitter import Triple
+from src.graph import create_graph
+from src.namespaces import GEO, TERN
+
+# Blank nodes of these types are written inline, as [ ... ], when they are
+# referenced once in a record. These are never shared across records.
+INLINE_TYPES = {TERN.Text, TERN.Instant, TERN.Attribute, GEO.Geometry}
+
+# Local names written as prefixed names; other IRIs are written in full.
+LOCAL_NAME = re.compile(r"[A-Za-z0-9_](?:[A-Za-z0-9_.\-]*[A-Za-z0-9_\-])?\Z")
+
+ESCAPES = str.maketrans({"\\": "\\\\", '"': '\\"', "\n": "\\n", "\r": "\\r"})
+
+INDENT = "    "
+
+
+def open_text(filename: str, mode: str = "w") -> TextIO:
+    """Open a text file, compressed with gzip or zstd by its ``.gz`` or ``.zst`` suffix."""
+    if filename.endswith(".gz"):
+        return gzip.open(filename, mode + "t", encoding="utf-8")
+    if filename.endswith(".zst"):
+        try:
+            import zstandard
+        except ImportError as e:
+            raise ImportError("zstd compressed files require zstandard.") from e
+        return zstandard.open(filename, mode + "t", encoding="utf-8")
+    return io.open(filename, mode, encoding="utf-8")
+
+
+class KeepLabels(dict):
+    """A blank node context of rdflib's N-Triples parser that keeps the labels of the file."""
+
+    def get(self, label, default=None):
+        return label
+
+
+def parse_ntriples(sink, filename: str):
+    """Add the triples of an N-Triples file, optionally compressed, to a graph or sink.
+
+    Unlike Graph.parse, blank nodes keep their labels, so a node written to
+    several files, e.g. an interned person in the shards of parallel
+    workers, is the same node in each, and the graph is the same every time
+    it is read.
+    """
+    if isinstance(sink, Graph):
+        sink = NTGraphSink(sink)
+    with open_text(filename, "r") as f:
+        W3CNTriplesParser(sink, bnode_context=KeepLabels()).parse(f)
+
+
+def reopen_text(filename: str, size: int) -> TextIO:
+    """Truncate a file written by open_text to ``size`` bytes and open it for appending.
+
+    A compressed file can only be truncated where a gzip member or zstd
+    frame ends, e.g. a size returned by RecordWriter.checkpoint.
+    """
+    with open(filename, "r+b") as f:
+        f.truncate(size)
+    return open_text(filename, "a")
+
+
+class TurtleSerializer:
+    """Write Turtle to a file handle one record at a time, without sorting the output.
+
+    The prefixes bound by create_graph are written once, then each record's
+    triples are written grouped by subject, in the order the subjects first
+    appear, with the blank nodes of INLINE_TYPES nested in their subject.
+    Blank nodes that are not inlined keep their label, so they may be
+    referenced from other records.
+    """
+
+    def __init__(self, file: TextIO, inline_types: Set[URIRef] = INLINE_TYPES):
+        self.file = file
+        self.inline_types = inline_types
+        self.namespaces: Dict[str, str] = {}
+        self.names: Dict[Node, str] = {}
+
+    def write_prefixes(self, write: bool = True):
+        """Write the prefixes, or only use them if they are already written."""
+        namespace_manager = create_graph().namespace_manager
+        for prefix, namespace in sorted(namespace_manager.namespaces()):
+            self.namespaces[str(namespace)] = prefix
+            if write:
+                self.file.write(f"@prefix {prefix}: <{namespace}> .\n")
+        if write:
+            self.file.write("\n")
+
+    def iri(self, iri: URIRef) -> str:
+        name = self.names.get(iri)
+        if name is None:
+            if len(self.names) >= 100_000:
+                self.names.clear()
+            name = self.names[iri] = self.prefixed_name(iri) or f"<{iri}>"
+        return name
+
+    def prefixed_name(self, iri: str) -> Optional[str]:
+        split = max(iri.rfind("#"), iri.rfind("/")) + 1
+        prefix = self.namespaces.get(iri[:split])
+        if prefix is None or not LOCAL_NAME.match(iri, split):
+            return None
+        return f"{prefix}:{iri[split:]}"
+
+    def term(self, node: Node) -> str:
+        if isinstance(node, Literal):
+            text = f'"{str(node).translate(ESCAPES)}"'
+            if node.language:
+                return f"{text}@{node.language}"
+            if node.datatype:
+                return f"{text}^^{self.iri(node.datatype)}"
+            return text
+        if isinstance(node, BNode):
+            return f"_:{node}"
+        return self.iri(node)
+
+    def write(self, triples: Iterable[Triple]):
+        """Write the triples of one record."""
+        subjects: Dict[Node, Dict[Node, List[Node]]] = {}
+        references: Dict[BNode, int] = {}
+        for s, p, o in triples:
+            objects = subjects.setdefault(s, {}).setdefault(p, [])
+            if o not in objects:
+                objects.append(o)
+                if isinstance(o, BNode):
+                    references[o] = references.get(o, 0) + 1
+
+        inline = {
+            node
+            for node, count in references.items()
+            if count == 1
+            and node in subjects
+            and any(t in self.inline_types for t in subjects[node].get(RDF.type, ()))
+        }
+        # Blank nodes only referenced from each other in a cycle would never
+        # be written, so only those reached from a written subject are inlined.
+        reached = set()
+        stack = [s for s in subjects if s not in inline]
+        while stack:
+            for objects in subjects.get(stack.pop(), {}).values():
+                for obj in objects:
+                    if obj in inline and obj not in reached:
+                        reached.add(obj)
+                        stack.append(obj)
+        inline &= reached
+
+        lines = []
+        for subject, predicates in subjects.items():
+            if subject in inline:
+                continue
+            lines.append(self.term(subject))
+            self.write_predicates(predicates, subjects, inline, lines, 1)
+            lines.append(" .\n\n")
+        self.file.write("".join(lines))
+
+    def write_predicates(self, predicates, subjects, inline, lines, depth):
+        indent = INDENT * depth
+        for i, (predicate, objects) in enumerate(predicates.items()):
+            lines.append(" " if i == 0 else f" ;\n{indent}")
+            lines.append("a" if predicate == RDF.type else self.iri(predicate))
+            for j, obj in enumerate(objects):
+                lines.append(" " if j == 0 else " , ")
+                if obj in inline:
+                    lines.append("[")
+                    self.write_predicates(
+                        subjects[obj], subjects, inline, lines, depth + 1
+                    )
+                    lines.append(f"\n{indent}]")
+                else:
+                    lines.append(self.term(obj))
@@ -0,0 +1,143 @@
+from math import ceil, cos, floor, hypot, radians
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+# Metres in a degree of latitude, and of longitude at the equator.
+METRES_PER_DEGREE = 111_320
+
+# Records are never merged into a site further away than this, whatever
+# their coordinate uncertainty, which also sets the size of the grid cells.
+MAX_SITE_RADIUS = 1_000.0
+
+
+class SiteIndex:
+    """Cluster the points of records into sites with a grid hash.
+
+    A record joins the nearest site with the same location remarks that is
+    within the larger of the two coordinate uncertainties (capped at
+    ``max_radius`` metres) of the site's first point, else it starts a new
+    site. A point without an uncertainty only joins a site at the same
+    coordinates. Sites are identified by the recordID of their first
+    record, so the ids do not depend on the order of later records.
+
+    Sites are kept in cells of ``max_radius`` metres of latitude, so a
+    lookup only reads the cells around the point, and memory grows with
+    the number of sites, not records.
+    """
+
+    def __init__(self, max_radius: float = MAX_SITE_RADIUS):
+        self.max_radius = max_radius
+        self.cell_degrees = max_radius / METRES_PER_DEGREE
+        self.cells: Dict[Tuple[int, int], List[int]] = {}
+        # Sites as parallel lists, indexed by the ids in cells.
+        self.latitudes: List[float] = []
+        self.longitudes: List[float] = []
+        self.radii: List[float] = []
+        self.remarks: List[Optional[str]] = []
+        self.record_ids: List[str] = []
+
+    def __len__(self):
+        return len(self.record_ids)
+
+    def cell(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        return (
+            floor(latitude / self.cell_degrees),
+            floor(longitude / self.cell_degrees),
+        )
+
+    def resolve(
+        self,
+        record_id: str,
+        latitude: Optional[float],
+        longitude: Optional[float],
+        uncertainty: Optional[float],
+        remarks: Optional[str],
+    ) -> str:
+        """Return the recordID of the first record of the point's site."""
+        if latitude is None or longitude is None:
+            return record_id
+        radius = min(uncertainty or 0.0, self.max_radius)
+
+        # Longitude cells narrow away from the equator, so more of them are
+        # within the radius.
+        scale = max(cos(radians(latitude)), 1e-6)
+        row, column = self.cell(latitude, longitude)
+        columns = ceil(1 / scale)
+        best, best_distance = None, None
+        for i in range(row - 1, row + 2):
+            for j in range(column - columns, column + columns + 1):
+                for site in self.cells.get((i, j), ()):
+                    if self.remarks[site] != remarks:
+                        continue
+                    distance = METRES_PER_DEGREE * hypot(
+                        latitude - self.latitudes[site],
+                        (longitude - self.longitudes[site]) * scale,
+                    )
+                    if distance <= max(radius, self.radii[site]) and (
+                        best is None or distance < best_distance
+                    ):
+                        best, best_distance = site, distance
+        if best is not None:
+            return self.record_ids[best]
+
+        self.cells.setdefault((row, column), []).append(len(self.record_ids))
+        self.latitudes.append(latitude)
+        self.longitudes.append(longitude)
+        self.radii.append(radius)
+        self.remarks.append(remarks)
+        self.record_ids.append(record_id)
+        return record_id
+
+    def resolve_row(self, row: pd.Series) -> str:
+        """Resolve the site of a preprocessed row, see ``resolve``."""
+        uncertainty = pd.to_numeric(
+            row["coordinateUncertaintyInMeters"], errors="coerce"
+        )
+        return self.resolve(
+            row["recordID"],
+            row["decimalLatitude"],
+            row["decimalLongitude"],
+            None if pd.isna(uncertainty) else uncertainty,
+            row["locationRemarks"],
+        )
+
+    def discard(self, record_id: str):
+        """Forget the site started by the last record resolved, if it was ``record_id``.
+
+        A record that fails to convert never writes its site, so the records
+        after it must not be merged into it.
+        """
+        if not self.record_ids or self.record_ids[-1] != record_id:
+            return
+        site = len(self.record_ids) - 1
+        self.cells[self.cell(self.latitudes[site], self.longitudes[site])].pop()
+        for values in (
+            self.latitudes,
+            self.longitudes,
+            self.radii,
+            self.remarks,
+            self.record_ids,
+        ):
+            values.pop()
+
+    def resolve_chunk(self, chunk: pd.DataFrame) -> pd.Series:
+        """Resolve the site of each row of a preprocessed chunk, see ``resolve``."""
+        uncertainty = pd.to_numeric(
+            chunk["coordinateUncertaintyInMeters"], errors="coerce"
+        )
+        uncertainty = uncertainty.astype(object).where(uncertainty.notna(), None)
+        return pd.Series(
+            [
+                self.resolve(*values)
+                for values in zip(
+                    chunk["recordID"],
+                    chunk["decimalLatitude"],
+                    chunk["decimalLongitude"],
+                    uncertainty,
+                    chunk["locationRemarks"],
+                )
+            ],
+            index=chunk.index,
+            dtype=object,
+        )
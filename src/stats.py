@@ -0,0 +1,125 @@
+import json
+from collections import Counter
+from typing import Dict, List, Optional, Set
+
+from rdflib import RDF, VOID, BNode, Graph, Literal, URIRef
+from rdflib.term import Node
+
+from src.delta import SHARED_TYPES
+from src.emitter import Triple
+from src.namespaces import TERN
+
+# Columns of the taxon of a record that the records are counted by.
+TAXON_COLUMNS = ("taxonConceptID", "family", "genus")
+
+
+def count(counter: Counter) -> Dict[str, int]:
+    """The counts of a counter as a JSON object, most common first."""
+    return {str(key): n for key, n in counter.most_common()}
+
+
+class DatasetStatistics:
+    """Gather the statistics of a dataset from its records as they are converted.
+
+    The triples of each record are counted by class and property, as VoID
+    class and property partitions. Entities shared by records, i.e. taxa and
+    procedures, are counted once, with the void:inDataset link to each record,
+    so the counts are those of the distinct triples of the output. The
+    values of each row are counted by taxon, family, genus and collector, and
+    the records by the site they were sampled at, with the spatial and
+    temporal extents of the records.
+    """
+
+    def __init__(self):
+        self.records = 0
+        self.triples = 0
+        self.classes: Counter = Counter()
+        self.properties: Counter = Counter()
+        self.shared: Set[Node] = set()
+        self.taxa = {column: Counter() for column in TAXON_COLUMNS}
+        self.collectors: Counter = Counter()
+        self.sites: Counter = Counter()
+        self.latitudes: List[Optional[float]] = [None, None]
+        self.longitudes: List[Optional[float]] = [None, None]
+        self.times: List[Optional[str]] = [None, None]
+
+    def add(self, row: dict, triples: List[Triple]):
+        self.records += 1
+
+        shared = {s for s, p, o in triples if p == RDF.type and o in SHARED_TYPES}
+        repeated = shared & self.shared
+        self.shared |= shared
+        for s, p, o in triples:
+            if s in repeated and p != VOID.inDataset:
+                continue
+            self.triples += 1
+            self.properties[p] += 1
+            if p == RDF.type:
+                self.classes[o] += 1
+            elif p == TERN.hasSite:
+                self.sites[o] += 1
+
+        for column in TAXON_COLUMNS:
+            if row.get(column):
+                self.taxa[column][row[column]] += 1
+        if row.get("recordedBy"):
+            self.collectors[row["recordedBy"]] += 1
+        extend(self.latitudes, row.get("decimalLatitude"))
+        extend(self.longitudes, row.get("decimalLongitude"))
+        extend(self.times, row.get("_result_time"))
+
+    def void(self, dataset: URIRef) -> Graph:
+        """The VoID description of the dataset, with its class and property partitions."""
+        g = Graph()
+        g.bind("void", VOID)
+        g.add((dataset, RDF.type, VOID.Dataset))
+        g.add((dataset, VOID.triples, Literal(self.triples)))
+        g.add((dataset, VOID.entities, Literal(sum(self.classes.values()))))
+        g.add((dataset, VOID.classes, Literal(len(self.classes))))
+        g.add((dataset, VOID.properties, Literal(len(self.properties))))
+        for cls, n in self.classes.most_common():
+            partition = BNode()
+            g.add((dataset, VOID.classPartition, partition))
+            g.add((partition, VOID["class"], cls))
+            g.add((partition, VOID.entities, Literal(n)))
+        for prop, n in self.properties.most_common():
+            partition = BNode()
+            g.add((dataset, VOID.propertyPartition, partition))
+            g.add((partition, VOID.property, prop))
+            g.add((partition, VOID.triples, Literal(n)))
+        return g
+
+    def index(self, dataset: URIRef) -> dict:
+        """The aggregate counts and extents of the dataset."""
+        return {
+            "dataset": str(dataset),
+            "records": self.records,
+            "triples": self.triples,
+            "classes": count(self.classes),
+            "properties": count(self.properties),
+            "taxa": {column: count(counter) for column, counter in self.taxa.items()},
+            "collectors": count(self.collectors),
+            "sites": {"count": len(self.sites), "records": count(self.sites)},
+            "spatial": {
+                "west": self.longitudes[0],
+                "south": self.latitudes[0],
+                "east": self.longitudes[1],
+                "north": self.latitudes[1],
+            },
+            "temporal": {"start": self.times[0], "end": self.times[1]},
+        }
+
+    def write(self, dataset: URIRef, void_filename: str, index_filename: str):
+        self.void(dataset).serialize(void_filename, format="turtle")
+        with open(index_filename, "w") as f:
+            json.dump(self.index(dataset), f, indent=2)
+
+
+def extend(extent: list, value):
+    """Widen a [minimum, maximum] extent to include a value, if there is one."""
+    if value is None or value != value:
+        return
+    if extent[0] is None or value < extent[0]:
+        extent[0] = value
+    if extent[1] is None or value > extent[1]:
+        extent[1] = value
@@ -0,0 +1,272 @@
+import os
+import sqlite3
+from typing import Iterator, List, Optional, Tuple
+
+from rdflib import BNode, Graph, Literal, URIRef
+from rdflib.store import NO_STORE, VALID_STORE, Store
+from rdflib.term import Node
+
+from src.emitter import Triple
+
+# Triples are kept until this many are pending, then inserted in one transaction.
+BATCH_SIZE = 100_000
+
+# Triples are appended without a key, which is much faster to load than
+# keeping an index up to date. The index is built on the first read, and
+# duplicates are dropped when reading.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS triples (
+    s TEXT NOT NULL,
+    p TEXT NOT NULL,
+    o TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS namespaces (
+    prefix TEXT PRIMARY KEY,
+    namespace TEXT NOT NULL
+);
+"""
+INDEX = "CREATE INDEX IF NOT EXISTS triples_spo ON triples (s, p, o)"
+
+
+def encode(term: Node) -> str:
+    """Encode a term as text that decodes back to an equal term."""
+    # Dispatch on the exact type first, isinstance is slow for rdflib terms.
+    kind = type(term)
+    if kind is URIRef:
+        return "".join(("<", term))
+    if kind is BNode:
+        return "".join(("_", term))
+    if isinstance(term, Literal):
+        return f'"{term}\0{term.datatype or ""}\0{term.language or ""}'
+    return encode(URIRef(term) if isinstance(term, URIRef) else BNode(term))
+
+
+def decode(text: str) -> Node:
+    if text[0] == '"':
+        lexical, datatype, language = text[1:].split("\0")
+        return Literal(
+            lexical,
+            datatype=URIRef(datatype) if datatype else None,
+            lang=language or None,
+        )
+    if text[0] == "_":
+        return BNode(text[1:])
+    return URIRef(text[1:])
+
+
+class TermDecoder:
+    """Decode terms, reusing the terms decoded recently.
+
+    Predicates and many objects, e.g. types and vocabulary terms, repeat
+    across subjects and making rdflib terms is comparatively slow.
+    """
+
+    def __init__(self, maxsize: int = 100_000):
+        self.maxsize = maxsize
+        self.terms = {}
+
+    def __call__(self, text: str) -> Node:
+        term = self.terms.get(text)
+        if term is None:
+            if len(self.terms) >= self.maxsize:
+                self.terms.clear()
+            term = self.terms[text] = decode(text)
+        return term
+
+
+class SQLiteStore(Store):
+    """An rdflib store that keeps the triples of one graph in a SQLite database.
+
+    Triples are buffered and inserted in batches of ``batch_size``, each in
+    one transaction. Lookups read from the database lazily, so a graph can
+    be serialized without loading it into memory. Namespace bindings are
+    kept in the database with the triples.
+    """
+
+    context_aware = False
+    formula_aware = False
+    transaction_aware = False
+    graph_aware = False
+
+    def __init__(
+        self,
+        configuration: Optional[str] = None,
+        identifier=None,
+        batch_size: int = BATCH_SIZE,
+    ):
+        self.batch_size = batch_size
+        self.connection: Optional[sqlite3.Connection] = None
+        self.pending: List[Tuple[str, str, str]] = []
+        self.indexed = False
+        self.__namespace = {}
+        self.__prefix = {}
+        super().__init__(configuration, identifier)
+
+    def open(self, configuration: str, create: bool = False) -> Optional[int]:
+        """Open the database, or with ``create`` start a new one in its place.
+
+        The connection may be used from any thread, e.g. by the request
+        handlers of src/endpoint.py, but only by one at a time.
+        """
+        if create:
+            self.destroy(configuration)
+        elif not os.path.exists(configuration):
+            return NO_STORE
+        self.connection = sqlite3.connect(configuration, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = OFF")
+        self.connection.executescript(SCHEMA)
+        for prefix, namespace in self.connection.execute(
+            "SELECT prefix, namespace FROM namespaces"
+        ):
+            self.__namespace[prefix] = URIRef(namespace)
+            self.__prefix[URIRef(namespace)] = prefix
+        return VALID_STORE
+
+    def close(self, commit_pending_transaction: bool = False):
+        if self.connection is not None:
+            self.commit()
+            self.connection.close()
+            self.connection = None
+
+    def destroy(self, configuration: str):
+        self.close()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(configuration + suffix):
+                os.remove(configuration + suffix)
+
+    def flush(self):
+        """Insert the pending triples in one transaction."""
+        if self.pending:
+            with self.connection:
+                self.connection.executemany(
+                    "INSERT INTO triples VALUES (?, ?, ?)", self.pending
+                )
+            self.pending = []
+
+    def prepare_read(self):
+        """Insert the pending triples and index the table if it is not yet."""
+        self.flush()
+        if not self.indexed:
+            with self.connection:
+                self.connection.execute(INDEX)
+            self.indexed = True
+
+    def commit(self):
+        self.flush()
+        with self.connection:
+            self.connection.execute("DELETE FROM namespaces")
+            self.connection.executemany(
+                "INSERT INTO namespaces VALUES (?, ?)",
+                ((prefix, str(ns)) for prefix, ns in self.__namespace.items()),
+            )
+
+    def rollback(self):
+        self.pending = []
+
+    def add(self, triple: Triple, context=None, quoted: bool = False):
+        Store.add(self, triple, context, quoted)
+        self.pending.append(tuple(encode(term) for term in triple))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def addN(self, quads):
+        for s, p, o, _ in quads:
+            self.pending.append((encode(s), encode(p), encode(o)))
+            if len(self.pending) >= self.batch_size:
+                self.flush()
+
+    def remove(self, triple_pattern, context=None):
+        self.prepare_read()
+        where, parameters = self.where(triple_pattern)
+        with self.connection:
+            self.connection.execute(f"DELETE FROM triples{where}", parameters)
+
+    def where(self, triple_pattern) -> Tuple[str, List[str]]:
+        conditions, parameters = [], []
+        for column, term in zip("spo", triple_pattern):
+            if term is not None:
+                conditions.append(f"{column} = ?")
+                parameters.append(encode(term))
+        return (" WHERE " + " AND ".join(conditions) if conditions else ""), parameters
+
+    def triples(self, triple_pattern, context=None):
+        self.prepare_read()
+        where, parameters = self.where(triple_pattern)
+        cursor = self.connection.execute(
+            f"SELECT DISTINCT s, p, o FROM triples{where}", parameters
+        )
+        decode = TermDecoder()
+        for s, p, o in cursor:
+            yield (decode(s), decode(p), decode(o)), iter(())
+
+    def triples_by_subject(self) -> Iterator[List[Triple]]:
+        """Yield the triples of each subject in turn, ordered by subject."""
+        self.prepare_read()
+        decode = TermDecoder()
+        subject, triples = None, []
+        for s, p, o in self.connection.execute(
+            "SELECT DISTINCT s, p, o FROM triples ORDER BY s, p, o"
+        ):
+            if s != subject:
+                if triples:
+                    yield triples
+                    triples = []
+                subject, node = s, decode(s)
+            triples.append((node, decode(p), decode(o)))
+        if triples:
+            yield triples
+
+    def __len__(self, context=None) -> int:
+        self.prepare_read()
+        return self.connection.execute(
+            "SELECT COUNT(*) FROM (SELECT DISTINCT s, p, o FROM triples)"
+        ).fetchone()[0]
+
+    def contexts(self, triple=None):
+        return iter(())
+
+    # Same binding rules as rdflib's Memory store.
+    def bind(self, prefix: str, namespace: URIRef, override: bool = True):
+        bound_namespace = self.__namespace.get(prefix)
+        bound_prefix = self.__prefix.get(namespace)
+        if bound_prefix is None:
+            bound_prefix = self.__prefix.get(bound_namespace)
+        if override:
+            if bound_prefix is not None:
+                del self.__namespace[bound_prefix]
+            if bound_namespace is not None:
+                del self.__prefix[bound_namespace]
+            self.__prefix[namespace] = prefix
+            self.__namespace[prefix] = namespace
+        else:
+            self.__prefix[namespace if bound_namespace is None else bound_namespace] = (
+                prefix if bound_prefix is None else bound_prefix
+            )
+            self.__namespace[prefix if bound_prefix is None else bound_prefix] = (
+                namespace if bound_namespace is None else bound_namespace
+            )
+
+    def namespace(self, prefix: str) -> Optional[URIRef]:
+        return self.__namespace.get(prefix)
+
+    def prefix(self, namespace: URIRef) -> Optional[str]:
+        return self.__prefix.get(namespace)
+
+    def namespaces(self):
+        yield from self.__namespace.items()
+
+
+def open_sqlite_graph(
+    filename: str, batch_size: int = BATCH_SIZE, create: bool = True
+) -> Graph:
+    """Open a graph kept in the SQLite database ``filename``.
+
+    With ``create``, the graph starts empty, replacing any database already
+    at ``filename``, so a run never adds to the triples of an earlier one.
+    Otherwise the existing database is opened as it is.
+    """
+    g = Graph(store=SQLiteStore(batch_size=batch_size))
+    if g.open(filename, create=create) == NO_STORE:
+        raise FileNotFoundError(f"No graph store at {filename}.")
+    return g
@@ -0,0 +1,321 @@
+import json
+import os
+import shutil
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from rdflib import RDF, VOID, BNode, Graph, URIRef
+from rdflib.plugins.serializers.nquads import _nq_row
+from rdflib.plugins.serializers.nt import _nt_row
+
+from src.emitter import Triple
+from src.namespaces import TERN
+from src.serializer import TurtleSerializer, open_text, reopen_text
+
+# pandas, numpy and the modules that use them are only imported by the
+# functions that need them, so that writing records, e.g. a single one from
+# the command line, does not wait for them.
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from src.buffer import TripleBuffer
+    from src.sites import SiteIndex
+
+FORMATS = {"nt": "nt", "nquads": "nq", "turtle": "ttl", "record-graphs": "graphs"}
+
+# Records per file of the record-graphs output.
+RECORDS_PER_SHARD = 10_000
+
+# Minimum number of triples write_graph passes to a writer at a time.
+WRITE_BLOCK_SIZE = 10_000
+
+
+def iter_rows(
+    filename: str,
+    chunksize: int = 10_000,
+    start: int = 0,
+    stop: Optional[int] = None,
+    columns: Optional[List[str]] = None,
+    sites: Optional["SiteIndex"] = None,
+    select: Optional[Callable[["pd.DataFrame"], "pd.Series"]] = None,
+) -> Iterator[Tuple[int, "pd.Series"]]:
+    """Yield the preprocessed rows of an input file, reading it ``chunksize`` rows at a time.
+
+    Only the rows numbered from ``start`` up to ``stop`` are read, and only
+    the ``columns`` the mapping needs unless given. With ``select``, only
+    the rows of each chunk it is true for are preprocessed and yielded. With
+    ``sites``, the ``_site`` column is the recordID of the first record of
+    the row's site.
+    """
+    from src.preprocess import preprocess
+    from src.readers import mapped_columns, read_chunks
+
+    if columns is None:
+        columns = mapped_columns()
+    for chunk in read_chunks(filename, columns, chunksize, start, stop):
+        if select is not None:
+            chunk = chunk[select(chunk)]
+            if not len(chunk):
+                continue
+        chunk = preprocess(chunk)
+        if sites is not None:
+            chunk["_site"] = sites.resolve_chunk(chunk)
+        yield from chunk.iterrows()
+
+
+class RecordWriter:
+    """Append the triples of each record to an output file as they are produced.
+
+    Files ending in ``.gz`` or ``.zst`` are compressed with gzip or zstd.
+    With ``size``, the file is truncated to it and appended to, to resume
+    a conversion from a checkpoint.
+    """
+
+    def __init__(self, filename: str, size: Optional[int] = None):
+        self.filename = filename
+        if size is None:
+            self.file = open_text(filename)
+        else:
+            self.file = reopen_text(filename, size)
+
+    def write(self, triples: Iterable[Triple]):
+        raise NotImplementedError
+
+    def checkpoint(self) -> int:
+        """Flush the output to disk and return its size, which it can be resumed from.
+
+        A compressed file is closed and opened again for appending, which
+        starts a new gzip member or zstd frame.
+        """
+        if self.filename.endswith((".gz", ".zst")):
+            self.file.close()
+            self.file = open_text(self.filename, "a")
+        else:
+            self.file.flush()
+        os.fsync(self.file.fileno())
+        return os.path.getsize(self.filename)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class NTriplesWriter(RecordWriter):
+    def write(self, triples: Iterable[Triple]):
+        self.file.writelines(_nt_row(triple) for triple in triples)
+
+
+class NQuadsWriter(RecordWriter):
+    def __init__(self, filename: str, graph: URIRef, size: Optional[int] = None):
+        super().__init__(filename, size)
+        self.graph = Graph(identifier=graph)
+
+    def write(self, triples: Iterable[Triple]):
+        self.file.writelines(_nq_row(triple, self.graph) for triple in triples)
+
+
+class TurtleWriter(RecordWriter):
+    """Write one Turtle block per record under a single set of prefixes."""
+
+    def __init__(self, filename: str, size: Optional[int] = None):
+        super().__init__(filename, size)
+        self.serializer = TurtleSerializer(self.file)
+        self.serializer.write_prefixes(write=not size)
+
+    def write(self, triples: Iterable[Triple]):
+        self.serializer.write(triples)
+
+    def checkpoint(self) -> int:
+        size = super().checkpoint()
+        self.serializer.file = self.file
+        return size
+
+
+class RecordGraphWriter(RecordWriter):
+    """Write each record into its own named graph, in gzip N-Quads shards.
+
+    The output is a directory of shards of ``records_per_shard`` records,
+    and a manifest.json listing them. A record's graph is named by the IRI
+    of its RDFDataset, so a loader can replace one record by replacing its
+    graph. Triples of a block without an RDFDataset go to ``graph``.
+
+    Interned entities are only written with the first record they are part
+    of, so records should not be interned if they are to be replaced.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        graph: Optional[URIRef] = None,
+        records_per_shard: int = RECORDS_PER_SHARD,
+    ):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.graph = graph
+        self.records_per_shard = records_per_shard
+        self.file = None
+        self.shards = []
+
+    def open_shard(self):
+        if self.file is not None:
+            self.file.close()
+        name = f"part-{len(self.shards):05d}.nq.gz"
+        self.file = open_text(os.path.join(self.directory, name))
+        self.shards.append({"file": name, "records": 0, "quads": 0})
+
+    def write(self, triples: Iterable[Triple]):
+        triples = list(triples)
+        record = record_graph_name(triples, self.graph)
+        if self.file is None or self.shards[-1]["records"] >= self.records_per_shard:
+            self.open_shard()
+        graph = f" {record.n3()} .\n"
+        # _nt_row ends the statement with " .\n", which is replaced by the graph.
+        self.file.writelines(_nt_row(triple)[:-3] + graph for triple in triples)
+        self.shards[-1]["records"] += 1
+        self.shards[-1]["quads"] += len(triples)
+
+    def checkpoint(self) -> int:
+        raise ValueError("Record graphs can not be resumed from a checkpoint.")
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+        write_manifest(self.directory, self.shards)
+
+
+def record_graph_name(triples: List[Triple], graph: Optional[URIRef]) -> URIRef:
+    """The graph of a record, named by its RDFDataset, or ``graph`` if it has none."""
+    record = next(
+        (s for s, p, o in triples if p == RDF.type and o == TERN.RDFDataset), graph
+    )
+    if record is None:
+        raise ValueError("Triples without an RDFDataset need a graph name.")
+    return record
+
+
+def write_manifest(directory: str, shards: List[dict]):
+    manifest = {
+        "format": "application/n-quads",
+        "compression": "gzip",
+        "graphs": "one named graph per record, named by the RDFDataset IRI",
+        "records": sum(shard["records"] for shard in shards),
+        "quads": sum(shard["quads"] for shard in shards),
+        "shards": shards,
+    }
+    with open(os.path.join(directory, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+
+def merge_record_graphs(directories: List[str], output_directory: str):
+    """Move the shards of several record-graphs outputs into one, in order."""
+    os.makedirs(output_directory, exist_ok=True)
+    shards = []
+    for i, directory in enumerate(directories):
+        with open(os.path.join(directory, "manifest.json")) as f:
+            for shard in json.load(f)["shards"]:
+                name = f"part-{i:05d}-{shard['file'][len('part-'):]}"
+                os.replace(
+                    os.path.join(directory, shard["file"]),
+                    os.path.join(output_directory, name),
+                )
+                shards.append({**shard, "file": name})
+        shutil.rmtree(directory)
+    write_manifest(output_directory, shards)
+
+
+def open_writer(
+    filename: str,
+    format: str,
+    graph: Optional[URIRef] = None,
+    records_per_shard: int = RECORDS_PER_SHARD,
+    size: Optional[int] = None,
+) -> RecordWriter:
+    """Open a writer of ``format``, resuming the file at ``size`` if given."""
+    if format == "record-graphs":
+        if size is not None:
+            raise ValueError("Record graphs can not be resumed from a checkpoint.")
+        return RecordGraphWriter(filename, graph, records_per_shard)
+    if format == "nt":
+        return NTriplesWriter(filename, size)
+    if format == "nquads":
+        if graph is None:
+            raise ValueError("N-Quads output needs a graph name.")
+        return NQuadsWriter(filename, graph, size)
+    if format == "turtle":
+        return TurtleWriter(filename, size)
+    raise ValueError(f"Unsupported streaming format {format!r}.")
+
+
+def write_graph(
+    g: Union[Graph, "TripleBuffer"],
+    filename: str,
+    format: str = "turtle",
+    graph: Optional[URIRef] = None,
+):
+    """Write a graph with a streaming writer, a block of triples at a time.
+
+    A graph kept in a SQLite store is read from the database in subject
+    order, so it is never loaded into memory as a whole. A graph in memory,
+    or a triple buffer, is written one record at a time.
+    """
+    from src.buffer import TripleBuffer
+    from src.store import SQLiteStore
+
+    if format == "record-graphs":
+        raise ValueError("Record graphs can only be written while converting.")
+    if isinstance(g, TripleBuffer):
+        blocks = g.record_blocks()
+    elif isinstance(g.store, SQLiteStore):
+        blocks = g.store.triples_by_subject()
+    else:
+        blocks = record_blocks(g)
+    with open_writer(filename, format, graph) as writer:
+        block = []
+        for triples in blocks:
+            block.extend(triples)
+            if len(block) >= WRITE_BLOCK_SIZE:
+                writer.write(block)
+                block = []
+        writer.write(block)
+
+
+def record_blocks(g: Graph) -> Iterator[List[Triple]]:
+    """Yield the triples of each record of a graph, then those of no record.
+
+    A record's triples are those of the RDFDataset, of the entities in it
+    (void:inDataset) and of the blank nodes they reference. Entities in
+    several records are only yielded with the first.
+    """
+    written = set()
+
+    def block(subjects):
+        triples = []
+        while subjects:
+            subject = subjects.pop()
+            if subject in written:
+                continue
+            written.add(subject)
+            for triple in g.triples((subject, None, None)):
+                triples.append(triple)
+                if isinstance(triple[2], BNode) and triple[2] not in written:
+                    subjects.append(triple[2])
+        return triples
+
+    for record in g.subjects(RDF.type, TERN.RDFDataset):
+        yield block([*g.subjects(VOID.inDataset, record), record])
+    for subject in g.subjects(unique=True):
+        if subject not in written:
+            yield block([subject])
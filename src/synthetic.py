@@ -0,0 +1,172 @@
+import csv
+import random
+from pathlib import Path
+from uuid import UUID
+
+HEADINGS_FILENAME = Path(__file__).parent.parent / "headings.csv"
+
+SURNAMES = [
+    "Harvey", "Slabber", "Umbrello", "Parsons", "Teale", "Huey", "Runham",
+    "Greenham", "Framenau", "Waldock", "Rix", "Abrams", "Beavis", "Hillyer",
+    "Volschenk", "Burger", "Car", "Judd", "Perina", "Edward",
+]  # fmt: skip
+HABITATS = [
+    "gully", "under rock", "under rocks", "Drainage Line", "leaf litter",
+    "spinifex", "mulga woodland", "creek bed", "cave", "under bark",
+]  # fmt: skip
+SAMPLING_PROTOCOLS = [
+    "wet pitfall trap", "Targeted Searching", "tullgren", "hand collected",
+    "dry pitfall trap", "litter sifting", "hand collection",
+]  # fmt: skip
+FAMILIES = [
+    "Feaellidae", "Chthoniidae", "Olpiidae", "Garypidae", "Cheliferidae",
+    "Atemnidae", "Hyidae", "Syarinidae",
+]  # fmt: skip
+PLACES = [
+    "Wodgina Mine Site", "Port Hedland", "Mt Montagu", "Karratha", "Newman",
+    "Tom Price", "Marble Bar", "Paraburdoo", "Roebourne", "Pannawonica",
+]  # fmt: skip
+
+# The only values of these columns in the ALA download.
+CONSTANTS = {
+    "dataResourceUid": "dr348",
+    "dcterms:license": "CC-BY",
+    "institutionCode": "WAM",
+    "collectionCode": "ARACH",
+    "basisOfRecord": "PRESERVED_SPECIMEN",
+    "dynamicProperties": '{"type":"PhysicalObject"}',
+    "occurrenceStatus": "PRESENT",
+    "preparations": "wet (in ethanol or some other preservative)",
+    "country": "Australia",
+    "countryCode": "AU",
+    "stateProvince": "Western Australia",
+    "geodeticDatum": "EPSG:4326",
+    "kingdom": "Animalia",
+    "phylum": "Arthropoda",
+    "class": "Arachnida",
+    "order": "Pseudoscorpiones",
+    "taxonRank": "species",
+    "verbatimBasisOfRecord": "PreservedSpecimen",
+    "provenance": "Published dataset",
+}
+
+
+def read_header():
+    with open(HEADINGS_FILENAME, newline="") as f:
+        return [row["Column name"] for row in csv.DictReader(f)]
+
+
+def random_uuid(rng: random.Random) -> str:
+    return str(UUID(int=rng.getrandbits(128), version=4))
+
+
+def zipf_choice(rng: random.Random, population: list):
+    """Pick from ``population`` with a long-tailed (Zipf-like) frequency."""
+    return population[min(int(rng.paretovariate(1.0)) - 1, len(population) - 1)]
+
+
+def make_pools(rng: random.Random, n_rows: int):
+    """Build the collectors, taxa and sites that the records are drawn from."""
+    n_people = max(10, n_rows // 200)
+    people = [
+        f"{rng.choice(SURNAMES)}{'' if i < len(SURNAMES) else i}, "
+        f"{rng.choice('ABCDEFGHJKLMNPRSTW')}."
+        for i in range(n_people)
+    ]
+
+    taxa = []
+    for i in range(max(5, n_rows // 500)):
+        family = rng.choice(FAMILIES)
+        genus = family[:-4] + "a"
+        epithet = f"sp{i}"
+        year = rng.randint(1900, 2021)
+        taxa.append(
+            {
+                "taxonConceptID": "urn:lsid:biodiversity.org.au:afd.taxon:"
+                + random_uuid(rng),
+                "scientificName": f"{genus} {epithet}",
+                "family": family,
+                "genus": genus,
+                "specificEpithet": epithet,
+                "scientificNameAuthorship": f"{rng.choice(SURNAMES)}, {year}",
+                "species": f"{genus} {epithet}",
+            }
+        )
+
+    sites = []
+    for i in range(max(5, n_rows // 20)):
+        latitude = round(rng.uniform(-35.0, -14.0), 6)
+        longitude = round(rng.uniform(113.0, 129.0), 6)
+        sites.append(
+            {
+                "decimalLatitude": latitude,
+                "decimalLongitude": longitude,
+                "verbatimLatitude": latitude,
+                "verbatimLongitude": longitude,
+                "coordinateUncertaintyInMeters": rng.choice([10, 50, 50, 100, 1000]),
+                "locationRemarks": f"ca. {rng.randint(1, 200)} km "
+                f"{rng.choice(['N', 'S', 'E', 'W', 'SE', 'NW'])}. of "
+                f"{rng.choice(PLACES)}, site {i}",
+            }
+        )
+    return people, taxa, sites
+
+
+def generate_row(rng: random.Random, index: int, people, taxa, sites) -> dict:
+    row = dict(CONSTANTS)
+
+    row["recordID"] = random_uuid(rng)
+    row["catalogNumber"] = 100_000 + index
+    row["occurrenceID"] = f"urn:lsid:taxonomy.org.au:ARACH:{row['catalogNumber']}"
+    row["recordedBy"] = row["raw_recordedBy"] = zipf_choice(rng, people)
+    row["identifiedBy"] = zipf_choice(rng, people[:5])
+    row["individualCount"] = rng.choice([1, 1, 1, 2, 3])
+    row["lifeStage"] = rng.choice(["Adult", "Adult", "Adult", "Juvenile"])
+    row["habitat"] = rng.choice(HABITATS)
+    if rng.random() < 0.75:
+        row["sex"] = rng.choice(["MALE", "FEMALE"])
+    if rng.random() < 0.5:
+        row["samplingProtocol"] = rng.choice(SAMPLING_PROTOCOLS)
+    if rng.random() < 0.1:
+        row["typeStatus"] = rng.choice(["HOLOTYPE", "PARATYPE", "PARATYPE"])
+    if rng.random() < 0.4:
+        row["fieldNumber"] = f"{rng.randint(1, 9)}-{rng.randint(1, 200)}"
+
+    year = rng.randint(1960, 2021)
+    month = rng.randint(1, 12)
+    day = rng.randint(1, 28)
+    if rng.random() < 0.75:
+        row["eventDate"] = f"{year}-{month:02d}-{day:02d}T13:00:00Z"
+        row["year"], row["month"], row["day"] = year, month, day
+    else:
+        row["verbatimEventDate"] = f"{day:02d}/{month:02d}/{year}"
+    row["dateIdentified"] = rng.randint(year, 2021)
+
+    row.update(zipf_choice(rng, sites))
+    if rng.random() < 0.25:
+        row["verbatimElevation"] = f"{rng.randint(0, 1200)} m"
+
+    row.update(zipf_choice(rng, taxa))
+    return row
+
+
+def generate(filename: str, n_rows: int, seed: int = 0):
+    """Write a synthetic ALA download of ``n_rows`` records.
+
+    The file has the header of the ALA download (see headings.csv), and the
+    columns used by the mapping follow the null rates and value shapes of
+    records-2021-12-01.csv. Collectors, taxa and sites repeat across records
+    with long-tailed frequencies.
+    """
+    rng = random.Random(seed)
+    header = read_header()
+    people, taxa, sites = make_pools(rng, n_rows)
+
+    with open(filename, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_ALL)
+        writer.writerow(header)
+        for i in range(n_rows):
+            row = generate_row(rng, i, people, taxa, sites)
+            writer.writerow(
+                ["" if row.get(name) is None else row.get(name) for name in header]
+            )
@@ -0,0 +1,277 @@
+import asyncio
+import random
+import ssl
+import threading
+from base64 import b64encode
+from concurrent.futures import Future
+from typing import Iterable, List, Optional, Tuple
+from urllib.parse import quote, unquote, urlsplit
+
+from rdflib import URIRef
+from rdflib.plugins.serializers.nt import _nt_row
+
+from src.emitter import Triple
+from src.streaming import RecordWriter, record_graph_name
+
+# Triples posted in one request.
+UPLOAD_BATCH_SIZE = 50_000
+
+# Requests in flight at a time, which is also the number of pooled connections.
+UPLOAD_CONCURRENCY = 4
+
+# Attempts of a batch before giving up, waiting backoff * 2 ** attempt
+# seconds (with jitter) between them.
+UPLOAD_RETRIES = 5
+UPLOAD_BACKOFF = 0.5
+
+# Responses that are worth retrying.
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+class UploadError(RuntimeError):
+    pass
+
+
+class ConnectionPool:
+    """Keep-alive HTTP/1.1 connections to one host, opened as they are needed.
+
+    Only what posting to a Graph Store needs is supported: a request with a
+    body, and a response with a Content-Length, chunked or ended by closing
+    the connection.
+    """
+
+    def __init__(self, url: str, size: int, timeout: float):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.ssl = ssl.create_default_context() if parts.scheme == "https" else None
+        self.timeout = timeout
+        self.idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self.slots = asyncio.Semaphore(size)
+
+    async def request(
+        self, method: str, target: str, headers: dict, body: bytes
+    ) -> Tuple[int, bytes]:
+        async with self.slots:
+            if self.idle:
+                reader, writer = self.idle.pop()
+            else:
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.host, self.port, ssl=self.ssl),
+                    self.timeout,
+                )
+            try:
+                status, response, keep_alive = await asyncio.wait_for(
+                    self.exchange(reader, writer, method, target, headers, body),
+                    self.timeout,
+                )
+            except BaseException:
+                writer.close()
+                raise
+            if keep_alive:
+                self.idle.append((reader, writer))
+            else:
+                writer.close()
+            return status, response
+
+    async def exchange(self, reader, writer, method, target, headers, body):
+        head = [f"{method} {target} HTTP/1.1", f"Host: {self.host}:{self.port}"]
+        head.extend(f"{name}: {value}" for name, value in headers.items())
+        head.append(f"Content-Length: {len(body)}")
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError("Connection closed by the server.")
+        version, status = status_line.decode("latin-1").split()[:2]
+        response_headers = {}
+        while True:
+            line = (await reader.readline()).decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            response_headers[name.strip().lower()] = value.strip()
+
+        keep_alive = version == "HTTP/1.1" and (
+            response_headers.get("connection", "").lower() != "close"
+        )
+        if "content-length" in response_headers:
+            response = await reader.readexactly(int(response_headers["content-length"]))
+        elif response_headers.get("transfer-encoding", "").lower() == "chunked":
+            response = b""
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                response += await reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        elif int(status) in (204, 304) or 100 <= int(status) < 200:
+            response = b""
+        else:
+            response = await reader.read()
+            keep_alive = False
+        return int(status), response, keep_alive
+
+    def close(self):
+        for _, writer in self.idle:
+            writer.close()
+        self.idle = []
+
+
+class GraphStoreWriter(RecordWriter):
+    """Post the triples of each record to a SPARQL 1.1 Graph Store Protocol endpoint.
+
+    Triples are posted as N-Triples in batches of about ``batch_size``
+    triples to the named ``graph``, or the default graph, so each batch is
+    added to what the graph has. A record is never split across batches.
+    Blank nodes are only the same node within a request, so records must
+    not share blank nodes, i.e. not be interned, which run.py refuses.
+
+    Posting is not idempotent: a batch posted again, after a response was
+    lost or when resuming from a checkpoint, adds its blank nodes a second
+    time. With ``record_graphs``, each record is instead put into its own
+    named graph, named by the IRI of its RDFDataset as in the record-graphs
+    output, which replaces what the graph had, so a record is only ever
+    stored once however many times it is sent.
+
+    Requests run on an event loop in a background thread, up to
+    ``concurrency`` at a time over pooled keep-alive connections, while the
+    records are converted. ``write`` waits once ``2 * concurrency``
+    batches are pending. Failed requests are retried with exponential
+    backoff; a batch that still fails stops the upload with an UploadError.
+    User info in the endpoint URL is sent with HTTP Basic authentication.
+    """
+
+    def __init__(
+        self,
+        endpoint: str,
+        graph: Optional[URIRef] = None,
+        batch_size: int = UPLOAD_BATCH_SIZE,
+        concurrency: int = UPLOAD_CONCURRENCY,
+        retries: int = UPLOAD_RETRIES,
+        backoff: float = UPLOAD_BACKOFF,
+        timeout: float = 300.0,
+        record_graphs: bool = False,
+    ):
+        parts = urlsplit(endpoint)
+        self.path = parts.path or "/"
+        self.query = parts.query
+        self.graph = graph
+        self.record_graphs = record_graphs
+        self.headers = {"Content-Type": "application/n-triples; charset=utf-8"}
+        if parts.username is not None:
+            credentials = f"{unquote(parts.username)}:{unquote(parts.password or '')}"
+            self.headers["Authorization"] = "Basic " + b64encode(
+                credentials.encode("utf-8")
+            ).decode("ascii")
+
+        self.batch_size = batch_size
+        self.retries = retries
+        self.backoff = backoff
+        self.lines: List[str] = []
+        self.batches = self.triples = self.attempts = 0
+        self.futures: List[Future] = []
+        self.errors: List[BaseException] = []
+        self.pending = threading.BoundedSemaphore(2 * concurrency)
+
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.pool = self.run(self.make_pool(endpoint, concurrency, timeout))
+
+    async def make_pool(self, endpoint, concurrency, timeout) -> ConnectionPool:
+        # The pool's semaphore belongs to the loop it is made on.
+        return ConnectionPool(endpoint, concurrency, timeout)
+
+    def run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    def target(self, graph: Optional[URIRef]) -> str:
+        query = f"graph={quote(str(graph), safe='')}" if graph else "default"
+        return (
+            f"{self.path}?{self.query}&{query}"
+            if self.query
+            else f"{self.path}?{query}"
+        )
+
+    def write(self, triples: Iterable[Triple]):
+        if self.record_graphs:
+            triples = list(triples)
+            self.lines = [_nt_row(triple) for triple in triples]
+            self.submit("PUT", record_graph_name(triples, self.graph))
+            return
+        self.lines.extend(_nt_row(triple) for triple in triples)
+        if len(self.lines) >= self.batch_size:
+            self.submit()
+
+    def submit(self, method: str = "POST", graph: Optional[URIRef] = None):
+        if self.errors:
+            raise UploadError("Uploading a batch failed.") from self.errors[0]
+        if not self.lines:
+            return
+        body = "".join(self.lines).encode("utf-8")
+        n_triples = len(self.lines)
+        self.lines = []
+
+        target = self.target(graph or self.graph)
+        self.pending.acquire()
+        future = asyncio.run_coroutine_threadsafe(
+            self.send(method, target, body, n_triples), self.loop
+        )
+        future.add_done_callback(self.done)
+        self.futures = [f for f in self.futures if not f.done()]
+        self.futures.append(future)
+
+    def done(self, future: Future):
+        self.pending.release()
+        if future.exception() is not None:
+            self.errors.append(future.exception())
+
+    async def send(self, method: str, target: str, body: bytes, n_triples: int):
+        for attempt in range(self.retries):
+            self.attempts += 1
+            try:
+                status, response = await self.pool.request(
+                    method, target, self.headers, body
+                )
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError) as e:
+                error = e
+            else:
+                if 200 <= status < 300:
+                    self.batches += 1
+                    self.triples += n_triples
+                    return
+                error = UploadError(
+                    f"HTTP {status}: {response[:500].decode('utf-8', 'replace')}"
+                )
+                if status not in RETRY_STATUSES:
+                    raise error
+            if attempt + 1 < self.retries:
+                delay = self.backoff * 2**attempt
+                await asyncio.sleep(delay * random.uniform(0.5, 1.5))
+        raise error
+
+    def wait(self):
+        """Post the triples written so far and wait until every batch is done."""
+        self.submit()
+        for future in self.futures:
+            try:
+                future.result()
+            except BaseException:
+                pass
+        self.futures = []
+        if self.errors:
+            raise UploadError("Uploading a batch failed.") from self.errors[0]
+
+    def checkpoint(self) -> int:
+        self.wait()
+        return 0
+
+    def close(self):
+        try:
+            self.wait()
+        finally:
+            self.loop.call_soon_threadsafe(self.pool.close)
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+            self.loop.close()
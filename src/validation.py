@@ -0,0 +1,164 @@
+import json
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+from rdflib import RDF, SH, Graph
+from rdflib.plugins.serializers.nt import _nt_row
+from rdflib.term import Node
+
+from src.emitter import Triple
+from src.namespaces import TERN
+
+# Records sent to a worker at a time.
+VALIDATION_BATCH_SIZE = 100
+
+# Records kept as examples of each kind of validation result in the report.
+EXAMPLES = 5
+
+# The shapes graph of a worker process, loaded once by its initializer.
+shapes: Optional[Graph] = None
+
+
+def import_pyshacl():
+    try:
+        import pyshacl
+    except ImportError as e:
+        raise ImportError("SHACL validation requires pyshacl.") from e
+    return pyshacl
+
+
+def load_shapes(filename: str):
+    global shapes
+    import_pyshacl()
+    shapes = Graph().parse(filename)
+
+
+def label(node: Optional[Node]) -> Optional[str]:
+    return None if node is None else node.n3()
+
+
+def validate_records(records: List[Tuple[str, str]]) -> List[Tuple[str, bool, list]]:
+    """Validate records, given as their IRI and N-Triples, against the worker's shapes.
+
+    Returns the IRI of each record, whether it conforms and its results as
+    (severity, constraint component, path, message) tuples.
+    """
+    pyshacl = import_pyshacl()
+    validated = []
+    for record, data in records:
+        conforms, results, _ = pyshacl.validate(
+            Graph().parse(data=data, format="nt"),
+            shacl_graph=shapes,
+            inference="none",
+        )
+        validated.append(
+            (
+                record,
+                conforms,
+                [
+                    (
+                        label(results.value(result, SH.resultSeverity)),
+                        label(results.value(result, SH.sourceConstraintComponent)),
+                        label(results.value(result, SH.resultPath)),
+                        str(results.value(result, SH.resultMessage) or ""),
+                    )
+                    for result in results.subjects(RDF.type, SH.ValidationResult)
+                ],
+            )
+        )
+    return validated
+
+
+class RecordValidator:
+    """Validate each record's triples against SHACL shapes in a process pool.
+
+    A record is the RDFDataset and the entities emitted with it, which are
+    linked to it with void:inDataset. Records are sent to the workers in
+    batches of ``batch_size`` as they are written, and each worker loads
+    the shapes once. ``write`` waits once ``2 * workers`` batches are
+    pending. The results are counted by kind, i.e. severity, constraint
+    component, path and message, with a few of the records that have them.
+
+    Interned entities and merged sites are only part of the first record
+    they are emitted with, so run.py does not validate records that are
+    interned or merged into sites.
+    """
+
+    def __init__(
+        self,
+        shapes_filename: str,
+        workers: Optional[int] = None,
+        batch_size: int = VALIDATION_BATCH_SIZE,
+    ):
+        import_pyshacl()
+        workers = workers or os.cpu_count() or 1
+        self.executor = ProcessPoolExecutor(
+            workers, initializer=load_shapes, initargs=(shapes_filename,)
+        )
+        self.max_pending = 2 * workers
+        self.batch_size = batch_size
+        self.batch: List[Tuple[str, str]] = []
+        self.futures: Deque[Future] = deque()
+        self.records = 0
+        self.conforming = 0
+        self.results: Dict[tuple, dict] = {}
+
+    def write(self, triples: Iterable[Triple]):
+        triples = list(triples)
+        record = next(
+            (s for s, p, o in triples if p == RDF.type and o == TERN.RDFDataset), None
+        )
+        data = "".join(_nt_row(triple) for triple in triples)
+        self.batch.append((label(record), data))
+        if len(self.batch) >= self.batch_size:
+            self.submit()
+
+    def submit(self):
+        if self.batch:
+            self.futures.append(self.executor.submit(validate_records, self.batch))
+            self.batch = []
+        while len(self.futures) > self.max_pending:
+            self.collect(self.futures.popleft().result())
+
+    def collect(self, validated: List[Tuple[str, bool, list]]):
+        for record, conforms, results in validated:
+            self.records += 1
+            self.conforming += conforms
+            for key in dict.fromkeys(results):
+                entry = self.results.get(key)
+                if entry is None:
+                    entry = self.results[key] = {"records": 0, "examples": []}
+                entry["records"] += 1
+                if len(entry["examples"]) < EXAMPLES:
+                    entry["examples"].append(record)
+
+    def close(self):
+        self.submit()
+        while self.futures:
+            self.collect(self.futures.popleft().result())
+        self.executor.shutdown()
+
+    def report(self) -> dict:
+        results = [
+            {
+                "severity": severity,
+                "component": component,
+                "path": path,
+                "message": message,
+                **entry,
+            }
+            for (severity, component, path, message), entry in self.results.items()
+        ]
+        results.sort(key=lambda result: -result["records"])
+        return {
+            "records": self.records,
+            "conforming": self.conforming,
+            "non_conforming": self.records - self.conforming,
+            "results": results,
+        }
+
+    def write_report(self, filename: str):
+        with open(filename, "w") as f:
+            json.dump(self.report(), f, indent=2)
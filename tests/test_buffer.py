@@ -0,0 +1,23 @@
+from rdflib import RDF, BNode, Literal, URIRef
+
+from src.buffer import TripleBuffer
+from src.namespaces import TERN
+
+
+def test_empty_buffer_has_no_blocks():
+    buffer = TripleBuffer()
+    assert len(buffer) == 0
+    assert list(buffer.record_blocks()) == []
+
+
+def test_distinct_triples_are_counted_until_more_are_added():
+    buffer = TripleBuffer()
+    record = URIRef("https://example.com/record/1")
+    buffer.add((record, RDF.type, TERN.RDFDataset))
+    buffer.add((record, RDF.type, TERN.RDFDataset))
+    assert len(buffer) == 1
+    assert buffer.columns() is buffer.columns()
+
+    buffer.add((BNode("b1"), TERN.name, Literal("record 1")))
+    assert len(buffer) == 2
+    assert sum(len(block) for block in buffer.record_blocks()) == 2
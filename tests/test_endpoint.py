@@ -0,0 +1,80 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+import pytest
+from rdflib import RDF, Literal, URIRef
+
+from src.endpoint import SparqlEndpoint, load_graph, make_server
+from src.namespaces import TERN
+from src.store import open_sqlite_graph
+
+QUERY = "SELECT (COUNT(?record) AS ?n) WHERE { ?record a <%s> }" % TERN.RDFDataset
+
+
+@pytest.fixture
+def store_server(tmp_path):
+    filename = str(tmp_path / "output.sqlite")
+    g = open_sqlite_graph(filename)
+    for i in range(10):
+        record = URIRef(f"https://example.com/record/{i}")
+        g.add((record, RDF.type, TERN.RDFDataset))
+        g.add((record, TERN.name, Literal(f"record {i}")))
+    g.close()
+
+    server = make_server(SparqlEndpoint(load_graph([filename])), port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://localhost:{server.server_address[1]}/sparql"
+    server.shutdown()
+    server.server_close()
+
+
+def ask(url: str, query: str) -> dict:
+    request = Request(
+        f"{url}?{urlencode({'query': query})}",
+        headers={"Accept": "application/sparql-results+json"},
+    )
+    with urlopen(request, timeout=10) as response:
+        assert response.status == 200
+        return json.load(response)
+
+
+def test_store_is_queried_from_request_threads(store_server):
+    result = ask(store_server, QUERY)
+    assert result["results"]["bindings"][0]["n"]["value"] == "10"
+
+
+def test_concurrent_queries_of_a_store(store_server):
+    queries = [
+        f"SELECT ?name WHERE {{ <https://example.com/record/{i}> <{TERN.name}> ?name }}"
+        for i in range(10)
+    ]
+    with ThreadPoolExecutor(5) as pool:
+        results = list(pool.map(lambda query: ask(store_server, query), queries))
+    assert [
+        result["results"]["bindings"][0]["name"]["value"] for result in results
+    ] == [f"record {i}" for i in range(10)]
+
+
+def test_results_are_cached(store_server):
+    request = Request(f"{store_server}?{urlencode({'query': QUERY})}")
+    headers = []
+    for _ in range(2):
+        with urlopen(request, timeout=10) as response:
+            headers.append(response.headers["X-Cache"])
+    assert headers == ["miss", "hit"]
+
+
+def test_a_query_that_fails_is_answered_with_an_error(store_server):
+    query = "SELECT * WHERE { SERVICE <http://localhost:1/sparql> { ?s ?p ?o } }"
+    with pytest.raises(HTTPError) as error:
+        ask(store_server, query)
+    assert error.value.code == 500
+    assert error.value.read().startswith(b"Query failed: ")
+
+    with pytest.raises(HTTPError) as error:
+        ask(store_server, "SELECT WHERE")
+    assert error.value.code == 400
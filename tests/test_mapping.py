@@ -0,0 +1,39 @@
+import pytest
+
+from src.mapping import Mapping, MappingError, MappingRow
+
+TABLE = [
+    ("record", "@id", "uuid", "ex:", ""),
+    ("record", "rdf:type", "iri", "tern:RDFDataset", ""),
+    ("recorded-by", "@id", "bnode", "", ""),
+    ("recorded-by", "@shared", "person", "recordedBy", ""),
+    ("recorded-by", "sdo:name", "column", "recordedBy", ""),
+    ("taxon", "@id", "column", "taxonConceptID", ""),
+    ("taxon", "dwc:family", "column", "family", ""),
+]
+
+ROW = {
+    "recordID": "1",
+    "recordedBy": "A. Collector",
+    "taxonConceptID": "urn:lsid:example:1",
+    "family": "Feaellidae",
+}
+
+
+@pytest.fixture
+def mapping():
+    return Mapping(
+        [MappingRow(line, *row, "") for line, row in enumerate(TABLE, start=2)]
+    )
+
+
+def test_missing_values_leave_the_triple_out(mapping):
+    triples = mapping.convert({**ROW, "family": None})
+    assert len(triples) == 2
+
+
+@pytest.mark.parametrize("column", ["recordID", "recordedBy", "taxonConceptID"])
+def test_missing_ids_and_keys_raise(mapping, column):
+    assert len(mapping.convert(ROW)) == 3
+    with pytest.raises(MappingError, match=column):
+        mapping.convert({**ROW, column: None})
@@ -0,0 +1,19 @@
+from src.sites import SiteIndex
+
+
+def test_records_join_the_site_of_the_first_record():
+    sites = SiteIndex(100)
+    assert sites.resolve("a", -31.95, 115.86, 50.0, None) == "a"
+    assert sites.resolve("b", -31.9501, 115.86, 50.0, None) == "a"
+    assert sites.resolve("c", -31.96, 115.86, 50.0, None) == "c"
+
+
+def test_a_discarded_site_is_started_again_by_the_next_record():
+    sites = SiteIndex(100)
+    assert sites.resolve("a", -31.95, 115.86, 50.0, None) == "a"
+    sites.discard("a")
+    assert len(sites) == 0
+    assert sites.resolve("b", -31.9501, 115.86, 50.0, None) == "b"
+    # Only the site started by the last record resolved is discarded.
+    sites.discard("a")
+    assert sites.resolve("c", -31.95, 115.86, 50.0, None) == "b"
@@ -0,0 +1,136 @@
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+from rdflib import RDF, RDFS, VOID, BNode, Literal, URIRef
+
+from src.namespaces import TERN
+from src.upload import GraphStoreWriter
+
+GRAPH = URIRef("https://example.com/dataset")
+
+
+class GraphStore(ThreadingHTTPServer):
+    """A Graph Store Protocol stand-in that fails requests on their first attempts.
+
+    The first attempt of each request is answered with a 503. On the second,
+    the connection is dropped, after storing the body if ``store_on_drop``,
+    as when a response is lost. Later attempts succeed.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, store_on_drop: bool):
+        super().__init__(("127.0.0.1", 0), Handler)
+        self.store_on_drop = store_on_drop
+        self.lock = threading.Lock()
+        self.attempts: Counter = Counter()
+        self.graphs = {}
+
+    def store(self, method: str, graph: str, body: bytes):
+        with self.lock:
+            if method == "PUT":
+                self.graphs[graph] = [body]
+            else:
+                self.graphs.setdefault(graph, []).append(body)
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_PUT(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        graph = parse_qs(urlsplit(self.path).query)["graph"][0]
+        with self.server.lock:
+            self.server.attempts[(graph, body)] += 1
+            attempt = self.server.attempts[(graph, body)]
+        if attempt == 1:
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        elif attempt == 2:
+            if self.server.store_on_drop:
+                self.server.store(self.command, graph, body)
+            self.close_connection = True
+        else:
+            self.server.store(self.command, graph, body)
+            self.send_response(204)
+            self.end_headers()
+
+    do_POST = do_PUT
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def serve(store_on_drop: bool) -> GraphStore:
+        server = GraphStore(store_on_drop)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield serve
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def records(n: int):
+    for i in range(n):
+        record = URIRef(f"https://example.com/record/{i}")
+        node = BNode(f"b{i}")
+        yield [
+            (record, RDF.type, TERN.RDFDataset),
+            (node, RDFS.label, Literal(f"record {i}")),
+            (node, VOID.inDataset, record),
+        ]
+
+
+def upload(server: GraphStore, **kwargs) -> GraphStoreWriter:
+    writer = GraphStoreWriter(
+        f"http://127.0.0.1:{server.server_address[1]}/ds/data",
+        GRAPH,
+        concurrency=3,
+        backoff=0,
+        timeout=10,
+        **kwargs,
+    )
+    for triples in records(20):
+        writer.write(triples)
+    writer.close()
+    return writer
+
+
+def test_record_graphs_are_stored_once_when_responses_are_lost(serve):
+    server = serve(store_on_drop=True)
+    writer = upload(server, record_graphs=True)
+
+    assert writer.batches == 20
+    assert writer.attempts == 60
+    assert sorted(server.graphs) == sorted(
+        f"https://example.com/record/{i}" for i in range(20)
+    )
+    for graph, bodies in server.graphs.items():
+        assert len(bodies) == 1
+        assert bodies[0].decode().count(graph) == 2
+
+
+def test_batches_are_posted_once_after_retries(serve):
+    server = serve(store_on_drop=False)
+    writer = upload(server, batch_size=7)
+
+    # Records are not split, so batches of 7 triples hold 3 records.
+    assert writer.batches == 7
+    assert writer.triples == 60
+    lines = [
+        line
+        for body in server.graphs[str(GRAPH)]
+        for line in body.decode().splitlines()
+    ]
+    assert len(lines) == len(set(lines)) == 60